@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+import argparse
+import filecmp
+import glob
+import os
+import shutil
+import sys
+import types
+import simu
+from polyphony.compiler.__main__ import compile_main
+from polyphony.compiler.env import env
+
+
+ROOT_DIR = '.' + os.path.sep
+TEST_DIR = ROOT_DIR + 'tests'
+TMP_DIR  = ROOT_DIR + '.tmp'
+CACHE_DIR = TMP_DIR + os.path.sep + 'cache_test'
+FRESH_DIR = TMP_DIR + os.path.sep + 'cache_fresh'
+CHANGED = '_changed'
+
+
+def parse_options():
+    if not os.path.exists(TMP_DIR):
+        os.mkdir(TMP_DIR)
+    parser = argparse.ArgumentParser(prog='cache_test')
+    parser.add_argument('-d', '--enable_debug', dest='debug_mode',
+                        action='store_true', help='enable debug mode')
+    parser.add_argument('source', nargs='*', help='Python source file')
+    return parser.parse_args()
+
+
+def make_compile_options(casename, output_dir, cache_dir, test_options):
+    options = types.SimpleNamespace()
+    options.config = None
+    options.output_name = casename
+    options.output_dir = output_dir
+    options.verbose_level = 0
+    options.quiet_level = 0 if test_options.debug_mode else 3
+    options.debug_mode = test_options.debug_mode
+    options.verilog_dump = False
+    options.verilog_monitor = False
+    options.cache_dir = cache_dir
+    return options
+
+
+def cache_test(casefile_path, test_options):
+    '''
+    Compiles <case>.py and then <case>_changed.py with the same cache.
+    The second compilation reuses the HDL modules of the first one,
+    and its results must be the same as the fresh compilation of
+    <case>_changed.py and must pass the simulation.
+    '''
+    casefile = os.path.basename(casefile_path)
+    casename, _ = os.path.splitext(casefile)
+    changed_path = os.path.join(os.path.dirname(casefile_path), casename + CHANGED + '.py')
+    shutil.rmtree(CACHE_DIR, ignore_errors=True)
+    shutil.rmtree(FRESH_DIR, ignore_errors=True)
+    os.mkdir(FRESH_DIR)
+    try:
+        compile_main(casefile_path, make_compile_options(casename, TMP_DIR, CACHE_DIR, test_options))
+        compile_main(changed_path, make_compile_options(casename, TMP_DIR, CACHE_DIR, test_options))
+        testbenches = list(env.testbenches)
+        compile_main(changed_path, make_compile_options(casename, FRESH_DIR, None, test_options))
+    except Exception as e:
+        print('[CACHE TEST] FAILED:' + casefile_path)
+        print(e)
+        return False
+    for fresh in sorted(glob.glob(FRESH_DIR + os.path.sep + '*.v')):
+        cached = os.path.join(TMP_DIR, os.path.basename(fresh))
+        if not os.path.exists(cached) or not filecmp.cmp(cached, fresh, shallow=False):
+            print('[CACHE TEST] FAILED:' + casefile_path)
+            print('{} differs from the fresh compilation'.format(os.path.basename(fresh)))
+            return False
+    for testbench in testbenches:
+        if not simu.simulate_verilog(testbench.orig_name, casename, changed_path, test_options):
+            return False
+    return True
+
+
+if __name__ == '__main__':
+    options = parse_options()
+    if options.source:
+        tests = options.source
+    else:
+        tests = sorted(glob.glob('{0}/cache/*.py'.format(TEST_DIR)))
+        tests = [t for t in tests if not t.endswith(CHANGED + '.py')]
+    fails = 0
+    for t in tests:
+        print(t)
+        if not cache_test(t, options):
+            fails += 1
+    sys.exit(fails)
@@ -8,7 +8,8 @@ from .bitwidth import TempVarWidthSetter
 from .builtin import builtin_symbols
 from .cfgopt import BlockReducer, PathExpTracer
 from .cfgopt import HyperBlockBuilder
-from .common import read_source
+from .common import read_source, src_texts
+from .compilecache import CompileCache, CachedTestbench
 from .constopt import ConstantOpt
 from .constopt import ConstantOptPreDetectROM, EarlyConstantOptNonSSA
 from .constopt import PolyadConstantFolding
@@ -23,6 +24,7 @@ from .errors import CompileError, InterpretError
 from .hdlgen import HDLModuleBuilder
 from .hdlmodule import HDLModule
 from .iftransform import IfTransformer, IfCondTransformer
+from .incremental import IncrementalCompile
 from .inlineopt import InlineOpt
 from .inlineopt import FlattenFieldAccess, FlattenObjectArgs, FlattenModule
 from .inlineopt import AliasReplacer, ObjectHierarchyCopier
@@ -31,6 +33,7 @@ from .instantiator import EarlyModuleInstantiator, EarlyWorkerInstantiator
 from .iotransformer import IOTransformer
 from .iotransformer import WaitTransformer
 from .irtranslator import IRTranslator
+from .libcache import LibraryCache
 from .loopdetector import LoopDetector
 from .loopdetector import LoopInfoSetter
 from .loopdetector import LoopRegionSetter
@@ -38,9 +41,11 @@ from .loopdetector import LoopDependencyDetector
 from .looptransformer import LoopFlatten
 from .memorytransform import RomDetector
 from .memref import MemRefGraphBuilder, MemInstanceGraphBuilder
+from .parallel import ParallelPasses
 from .phiopt import PHIInlining
 from .phiresolve import PHICondResolver
 from .portconverter import PortConverter, FlattenPortList
+from .profiler import PassProfiler
 from .pure import interpret, PureCtorBuilder, PureFuncExecutor
 from .quadruplet import EarlyQuadrupleMaker
 from .quadruplet import LateQuadrupleMaker
@@ -63,7 +68,7 @@ from .typecheck import EarlyRestrictionChecker, RestrictionChecker, LateRestrict
 from .typecheck import AssertionChecker
 from .typecheck import SynthesisParamChecker
 from .unroll import LoopUnroller
-from .usedef import UseDefDetector
+from .usedef import UseDefChecker, UseDefDetector
 from .vericodegen import VerilogCodeGen
 from .veritestgen import VerilogTestGen
 import logging
@@ -353,7 +358,7 @@ def scalarize(driver, scope):
     TupleSSATransformer().process(scope)
     earlyquadruple(driver, scope)
     ObjectHierarchyCopier().process(scope)
-    usedef(driver, scope)
+    checkusedef(driver, scope)
     ObjectSSATransformer().process(scope)
     usedef(driver, scope)
     AliasReplacer().process(scope)
@@ -399,6 +404,11 @@ def checkcfg(driver, scope):
         CFGChecker().process(scope)
 
 
+def checkusedef(driver, scope):
+    if env.dev_debug_mode:
+        UseDefChecker().process(scope)
+
+
 def loop(driver, scope):
     LoopDetector().process(scope)
     #LoopRegionSetter().process(scope)
@@ -424,7 +434,6 @@ def unroll(driver, scope):
         PolyadConstantFolding().process(scope)
         pathexp(driver, scope)
         dumpscope(driver, scope)
-        usedef(driver, scope)
         constopt(driver, scope)
         usedef(driver, scope)
         copyopt(driver, scope)
@@ -446,6 +455,14 @@ def tempbit(driver, scope):
     TempVarWidthSetter().process(scope)
 
 
+def reusehdl(driver):
+    env.incremental.process_all(driver)
+
+
+def storehdl(driver, scope):
+    env.incremental.store(driver, scope)
+
+
 def dfg(driver, scope):
     DFGBuilder().process(scope)
 
@@ -587,6 +604,15 @@ def compile_plan():
     def pure(proc):
         return proc if env.config.enable_pure else None
 
+    def incremental(proc):
+        return proc if env.incremental else None
+
+    def parallel(procs):
+        procs = [p for p in procs if p is not None]
+        if env.jobs > 1 and not env.dev_debug_mode:
+            return [ParallelPasses(procs, env.jobs)]
+        return procs
+
     plan = [
         preprocess_global,
         pure(earlyinstantiate),
@@ -671,11 +697,9 @@ def compile_plan():
         dbg(dumpscope),
         usedef,
         copyopt,
-        usedef,
         deadcode,
         dbg(dumpscope),
         reduceblk,
-        usedef,
         loop,
         looptrans,
         laterestrictioncheck,
@@ -691,36 +715,40 @@ def compile_plan():
         usedef,
         convport,
         phase(env.PHASE_5),
-        usedef,
+        checkusedef,
         aliasvar,
         tempbit,
         dbg(dumpscope),
-        dfg,
-        synthcheck,
-        dbg(dumpdfg),
-        schedule,
-        #dumpdfgimg,
-        dbg(dumpsched),
-        meminstgraph,
-        dbg(dumpmrg),
-        assertioncheck,
-        filter_scope(is_hdlmodule_scope),
-        phase(env.PHASE_GEN_HDL),
-        createhdlmodule,
-        stg,
-        dbg(dumpstg),
-        buildmodule,
-        ahdlopt(ahdlusedef),
-        ahdlopt(reducebits),
-        #ahdlopt(reducereg),
-        dbg(dumpmodule),
-        transformio,
-        transformwait,
-        dbg(dumpmodule),
-        reducestate,
-        dbg(dumpmodule),
-        buildselector,
-        genhdl,
+        incremental(reusehdl),
+        *parallel([
+            dfg,
+            synthcheck,
+            dbg(dumpdfg),
+            schedule,
+            #dumpdfgimg,
+            dbg(dumpsched),
+            meminstgraph,
+            dbg(dumpmrg),
+            assertioncheck,
+            filter_scope(is_hdlmodule_scope),
+            phase(env.PHASE_GEN_HDL),
+            createhdlmodule,
+            stg,
+            dbg(dumpstg),
+            buildmodule,
+            ahdlopt(ahdlusedef),
+            ahdlopt(reducebits),
+            dbg(dumpmodule),
+            transformio,
+            transformwait,
+            dbg(dumpmodule),
+            reducestate,
+            ahdlopt(reducereg),
+            dbg(dumpmodule),
+            buildselector,
+            genhdl,
+            incremental(storehdl),
+        ]),
         dbg(dumphdl),
         dbg(printresouces),
     ]
@@ -729,13 +757,20 @@ def compile_plan():
 
 
 def setup(src_file, options):
-    import glob
+    setup_options(options)
+    setup_builtins(src_file)
+
+
+def setup_options(options):
     env.__init__()
+    src_texts.clear()
+    builtin_symbols.clear()
     env.dev_debug_mode = options.debug_mode
     env.verbose_level = options.verbose_level if options.verbose_level else 0
     env.quiet_level = options.quiet_level if options.quiet_level else 0
     env.enable_verilog_dump = options.verilog_dump
     env.enable_verilog_monitor = options.verilog_monitor
+    env.jobs = getattr(options, 'jobs', None) or 1
     if options.config:
         try:
             if os.path.exists(options.config):
@@ -749,6 +784,13 @@ def setup(src_file, options):
     if env.dev_debug_mode:
         logging.basicConfig(**logging_setting)
 
+
+def setup_builtins(src_file):
+    translate_builtins()
+    setup_global_namespace(src_file)
+
+
+def translate_builtins():
     translator = IRTranslator()
     root_dir = '{0}{1}{2}{1}'.format(
         os.path.dirname(__file__),
@@ -758,8 +800,14 @@ def setup(src_file, options):
     internal_dir = f'{env.root_dir}{os.path.sep}_internal'
     builtin_package_file = f'{internal_dir}{os.sep}_builtins.py'
     env.set_current_filename(builtin_package_file)
-    translator.translate(read_source(builtin_package_file), '__builtin__')
+    if env.lib_cache:
+        env.lib_cache.translate('__builtin__',
+                                lambda: translator.translate(read_source(builtin_package_file), '__builtin__'))
+    else:
+        translator.translate(read_source(builtin_package_file), '__builtin__')
+
 
+def setup_global_namespace(src_file):
     env.set_current_filename(src_file)
     g = Scope.create_namespace(None, env.global_scope_name, {'global'}, src_file)
     env.push_outermost_scope(g)
@@ -767,7 +815,7 @@ def setup(src_file, options):
         g.import_sym(sym)
 
 
-def compile(plan, source, src_file=''):
+def compile(plan, source, src_file='', profiler=None):
     translator = IRTranslator()
     translator.translate(source, '')
     if env.config.enable_pure:
@@ -776,47 +824,84 @@ def compile(plan, source, src_file=''):
                               with_global=True,
                               with_class=True,
                               with_lib=True)
-    driver = Driver(plan, scopes)
+    driver = Driver(plan, scopes, profiler)
     driver.run()
     return driver.codes
 
 
 def compile_main(src_file, options):
-    setup(src_file, options)
+    setup_options(options)
+    compile_source(src_file, options)
+
+
+def compile_source(src_file, options):
+    '''Compile src_file on the env that has been set up by setup_options()'''
     main_source = read_source(src_file)
-    compile_results = compile(compile_plan(), main_source, src_file)
-    output_individual(compile_results, options.output_name, options.output_dir)
+    cache_dir = getattr(options, 'cache_dir', None)
+    if cache_dir:
+        cache = CompileCache(cache_dir, getattr(options, 'cache_size', None))
+        cache_key = cache.key(src_file, main_source, options)
+        entry = cache.load(cache_key)
+        if entry:
+            for scope_name, _, is_testbench in entry['modules']:
+                if is_testbench:
+                    env.append_testbench(CachedTestbench(scope_name, scope_name))
+            write_outputs(entry['modules'], entry['libs'], options.output_name, options.output_dir)
+            env.destroy()
+            return
+        env.incremental = IncrementalCompile(cache, cache.salt(options))
+        if not env.dev_debug_mode:
+            env.lib_cache = LibraryCache(cache, cache.salt(options))
+    else:
+        cache = None
+    if '__builtin__' not in env.scopes:
+        translate_builtins()
+    setup_global_namespace(src_file)
+    profile_file = getattr(options, 'profile_file', None)
+    profiler = PassProfiler() if profile_file else None
+    compile_results = compile(compile_plan(), main_source, src_file, profiler)
+    modules = output_individual(compile_results, options.output_name, options.output_dir)
+    if cache:
+        cache.store(cache_key, modules, list(env.using_libs))
+    if profiler:
+        profiler.write(profile_file)
     env.destroy()
 
 
 def output_individual(compile_results, output_name, output_dir):
-    d = output_dir if output_dir else './'
-    if d[-1] != '/':
-        d += '/'
-
     scopes = Scope.get_scopes(with_class=True)
     scopes = [scope for scope in scopes
               if (scope.is_testbench() or (scope.is_module() and scope.is_instantiated()) or scope.is_function_module())]
+    modules = []
+    for scope in scopes:
+        if scope not in compile_results:
+            continue
+        code = compile_results[scope]
+        if not code:
+            continue
+        if scope.is_testbench():
+            env.append_testbench(scope)
+        modules.append((scope.qualified_name(), code, scope.is_testbench()))
+    write_outputs(modules, env.using_libs, output_name, output_dir)
+    return modules
+
+
+def write_outputs(modules, libs, output_name, output_dir):
+    d = output_dir if output_dir else './'
+    if d[-1] != '/':
+        d += '/'
     if output_name.endswith('.v'):
         output_name = output_name[:-2]
     with open(d + output_name + '.v', 'w') as f:
-        for scope in scopes:
-            if scope not in compile_results:
-                continue
-            code = compile_results[scope]
-            if not code:
-                continue
-            scope_name = scope.qualified_name()
+        for scope_name, code, is_testbench in modules:
             file_name = '{}.v'.format(scope_name)
             if output_name.upper() == scope_name.upper():
                 file_name = '_' + file_name
             with open('{}{}'.format(d, file_name), 'w') as f2:
                 f2.write(code)
-            if scope.is_testbench():
-                env.append_testbench(scope)
-            else:
+            if not is_testbench:
                 f.write('`include "./{}"\n'.format(file_name))
-        for lib in env.using_libs:
+        for lib in libs:
             f.write(lib)
 
 
@@ -841,6 +926,15 @@ def main():
                         action='store_true', help='output vcd file in testbench')
     parser.add_argument('-vm', '--verilog_monitor', dest='verilog_monitor',
                         action='store_true', help='enable $monitor in testbench')
+    parser.add_argument('-P', '--profile', dest='profile_file',
+                        metavar='FILE',
+                        help='write time and memory usage of each compile pass (.json or .csv)')
+    parser.add_argument('-j', '--jobs', dest='jobs', type=int,
+                        metavar='N', help='run the back-end passes on N processes')
+    parser.add_argument('--cache', dest='cache_dir',
+                        metavar='DIR', help='reuse the compile results stored in DIR')
+    parser.add_argument('--cache_size', dest='cache_size', type=int,
+                        metavar='BYTES', help='maximum size of the compile cache')
     from .. version import __version__
     parser.add_argument('-V', '--version', action='version',
                         version='%(prog)s ' + __version__,
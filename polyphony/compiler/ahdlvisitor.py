@@ -3,6 +3,13 @@ from .ahdl import AHDL_STM
 
 
 class AHDLVisitor(object):
+    # AHDL class -> (visitor function, whether the AHDL is a statement)
+    _visitors = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._visitors = {}
+
     def __init__(self):
         self.current_fsm = None
         self.current_stg = None
@@ -190,21 +197,32 @@ class AHDLVisitor(object):
         for c in ahdl.codes:
             self.visit(c)
 
-    def find_visitor(self, cls):
-        method = 'visit_' + cls.__name__
-        visitor = getattr(self, method, None)
-        if not visitor:
-            for base in cls.__bases__:
-                visitor = self.find_visitor(base)
-                if visitor:
-                    break
-        return visitor
+    @classmethod
+    def find_visitor(cls, ahdl_cls):
+        '''Returns the visitor function and whether ahdl_cls is a statement'''
+        try:
+            return cls._visitors[ahdl_cls]
+        except KeyError:
+            pass
+
+        def find_visitor_rec(c):
+            method = 'visit_' + c.__name__
+            visitor = getattr(cls, method, None)
+            if not visitor:
+                for base in c.__bases__:
+                    visitor = find_visitor_rec(base)
+                    if visitor:
+                        break
+            return visitor
+        entry = (find_visitor_rec(ahdl_cls), issubclass(ahdl_cls, AHDL_STM))
+        cls._visitors[ahdl_cls] = entry
+        return entry
 
     def visit(self, ahdl):
-        if ahdl.is_a(AHDL_STM):
+        visitor, is_stm = self.find_visitor(ahdl.__class__)
+        if is_stm:
             self.current_stm = ahdl
-        visitor = self.find_visitor(ahdl.__class__)
-        return visitor(ahdl)
+        return visitor(self, ahdl)
 
 
 class AHDLCollector(AHDLVisitor):
@@ -0,0 +1,184 @@
+import argparse
+import copy
+import io
+import json
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+from contextlib import redirect_stdout
+from .__main__ import setup_options, translate_builtins
+from .__main__ import compile_main, compile_source
+from .env import env
+from .errors import CompileError, InterpretError
+
+
+def read_manifest(filename):
+    '''Returns the source files listed in the manifest (one file per line)'''
+    sources = []
+    base_dir = os.path.dirname(filename)
+    with open(filename, 'r') as f:
+        for line in f:
+            line = line.split('#', 1)[0].strip()
+            if not line:
+                continue
+            sources.append(os.path.join(base_dir, line))
+    return sources
+
+
+def _source_options(options, source):
+    name, _ = os.path.splitext(os.path.basename(source))
+    opts = copy.copy(options)
+    opts.output_name = name
+    output_dir = options.output_dir if options.output_dir else '.'
+    opts.output_dir = os.path.join(output_dir, name) + os.path.sep
+    os.makedirs(opts.output_dir, exist_ok=True)
+    return opts
+
+
+_batch = None
+
+
+def _compile_one(index):
+    return _batch.compile_one(index)
+
+
+class BatchCompiler(object):
+    '''
+    Compiles many source files with one setup of the compiler.
+
+    The builtin library is translated once in the parent process and
+    every source file is compiled in a process forked from it, so each
+    compilation starts from the same clean env without re-translating
+    the builtins.
+    '''
+    def __init__(self, sources, options, jobs=1):
+        self.sources = sources
+        self.options = options
+        self.jobs = jobs
+        self.use_fork = 'fork' in multiprocessing.get_all_start_methods()
+
+    def compile_one(self, index):
+        source = self.sources[index]
+        opts = _source_options(self.options, source)
+        result = {'source': source, 'status': 'ok', 'time': 0.0, 'message': ''}
+        buf = io.StringIO()
+        start = time.perf_counter()
+        with redirect_stdout(buf):
+            try:
+                if self.use_fork:
+                    compile_source(source, opts)
+                else:
+                    compile_main(source, opts)
+            except (CompileError, InterpretError) as e:
+                result['status'] = 'error'
+                result['message'] = str(e)
+            except Exception:
+                result['status'] = 'crash'
+                result['message'] = traceback.format_exc()
+        result['time'] = time.perf_counter() - start
+        result['output'] = buf.getvalue()
+        return result
+
+    def run(self, on_result=None):
+        global _batch
+        results = []
+        if not self.use_fork:
+            for i in range(len(self.sources)):
+                result = self.compile_one(i)
+                if on_result:
+                    on_result(result)
+                results.append(result)
+            return results
+        setup_options(self.options)
+        translate_builtins()
+        _batch = self
+        try:
+            ctx = multiprocessing.get_context('fork')
+            with ctx.Pool(self.jobs, maxtasksperchild=1) as pool:
+                for result in pool.imap(_compile_one, range(len(self.sources))):
+                    if on_result:
+                        on_result(result)
+                    results.append(result)
+        finally:
+            _batch = None
+            env.destroy()
+        return results
+
+
+def print_result(result):
+    print('{:<6} {:8.2f}s {}'.format(result['status'].upper(), result['time'], result['source']))
+    if result['output']:
+        print(result['output'], end='')
+    if result['message']:
+        print(result['message'])
+
+
+def print_summary(results):
+    counts = {}
+    for r in results:
+        counts[r['status']] = counts.get(r['status'], 0) + 1
+    total_time = sum([r['time'] for r in results])
+    print('{} files: {} ok, {} error, {} crash ({:.2f}s)'.format(
+        len(results),
+        counts.get('ok', 0),
+        counts.get('error', 0),
+        counts.get('crash', 0),
+        total_time))
+
+
+def write_summary(results, filename):
+    with open(filename, 'w') as f:
+        json.dump(results, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='polyphony-batch')
+    parser.add_argument('-d', '--dir', dest='output_dir',
+                        metavar='DIR', help='output directory (a sub directory is made for each source)')
+    parser.add_argument('-c', '--config', dest='config',
+                        metavar='CONFIG', help='set configration(json literal or file)')
+    parser.add_argument('-q', '--quiet', dest='quiet_level',
+                        action='count', help='suppress warning/error messages')
+    parser.add_argument('-vd', '--verilog_dump', dest='verilog_dump',
+                        action='store_true', help='output vcd file in testbench')
+    parser.add_argument('-vm', '--verilog_monitor', dest='verilog_monitor',
+                        action='store_true', help='enable $monitor in testbench')
+    parser.add_argument('-j', '--jobs', dest='batch_jobs', type=int, default=1,
+                        metavar='N', help='compile N source files at once')
+    parser.add_argument('-m', '--manifest', dest='manifest',
+                        metavar='FILE', help='read the source files from FILE')
+    parser.add_argument('-s', '--summary', dest='summary_file',
+                        metavar='FILE', help='write the results in json format')
+    parser.add_argument('--cache', dest='cache_dir',
+                        metavar='DIR', help='reuse the compile results stored in DIR')
+    parser.add_argument('--cache_size', dest='cache_size', type=int,
+                        metavar='BYTES', help='maximum size of the compile cache')
+    parser.add_argument('sources', nargs='*', help='Python source files')
+    options = parser.parse_args()
+    sources = list(options.sources)
+    if options.manifest:
+        sources.extend(read_manifest(options.manifest))
+    for source in sources:
+        if not os.path.isfile(source):
+            print(source + ' is not valid file name')
+            parser.print_help()
+            sys.exit(1)
+    if not sources:
+        parser.print_help()
+        sys.exit(0)
+    options.verbose_level = 0
+    options.debug_mode = False
+    jobs = max(options.batch_jobs, 1)
+
+    results = BatchCompiler(sources, options, jobs).run(print_result)
+    print_summary(results)
+    if options.summary_file:
+        write_summary(results, options.summary_file)
+    if any([r['status'] != 'ok' for r in results]):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -37,6 +37,7 @@ class Block(object):
         self.path_exp = None
         self.synth_params = make_synth_params()
         self.is_hyperblock = False
+        self._stm_indices = {}
 
     def _str_connection(self):
         s = ''
@@ -78,7 +79,7 @@ class Block(object):
         return self.name
 
     def __lt__(self, other):
-        return self.order < other.order
+        return (self.order, self.num) < (other.order, other.num)
 
     def connect(self, next_block):
         self.succs.append(next_block)
@@ -92,14 +93,33 @@ class Block(object):
     def append_stm(self, stm):
         stm.block = self
         self.stms.append(stm)
+        if self.scope.usedef:
+            self.scope.usedef.add_stm(stm)
 
     def insert_stm(self, idx, stm):
         stm.block = self
         self.stms.insert(idx, stm)
+        if self.scope.usedef:
+            self.scope.usedef.add_stm(stm)
 
     def replace_stm(self, old_stm, new_stm):
         replace_item(self.stms, old_stm, new_stm)
         new_stm.block = self
+        if self.scope.usedef:
+            self.scope.usedef.remove_stm(old_stm)
+            self.scope.usedef.add_stm(new_stm)
+
+    def stm_index(self, stm):
+        '''
+        Returns the index of the stm in the block.
+        The statements are numbered at once and renumbered only when
+        the stms list has been changed, so sorting statements stays fast.
+        '''
+        idx = self._stm_indices.get(id(stm))
+        if idx is None or idx >= len(self.stms) or self.stms[idx] is not stm:
+            self._stm_indices = {id(s): i for i, s in enumerate(self.stms)}
+            idx = self._stm_indices[id(stm)]
+        return idx
 
     def stm(self, idx):
         if len(self.stms):
@@ -224,11 +244,12 @@ class Block(object):
                 continue
             defstms = usedef.get_stms_defining(cond.symbol())
             assert len(defstms) == 1
-            stm = defstms.pop()
+            stm = list(defstms)[0]
             usestms = usedef.get_stms_using(cond.symbol())
             if len(usestms) > 1:
                 continue
             stm.block.stms.remove(stm)
+            usedef.remove_stm(stm)
 
     def is_loop_head(self):
         r = self.scope.find_region(self)
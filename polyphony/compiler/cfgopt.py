@@ -43,6 +43,8 @@ class BlockReducer(object):
             stm = block.stms[-1]
             if stm.is_a(CJUMP) and stm.true is stm.false:
                 block.stms.pop()
+                if scope.usedef:
+                    scope.usedef.remove_stm(stm)
                 block.append_stm(JUMP(stm.true))
                 block.succs = [stm.true]
                 # leave only first mathced item
@@ -50,6 +52,8 @@ class BlockReducer(object):
                 assert 1 == stm.true.preds.count(block)
             elif stm.is_a(MCJUMP) and len(set(stm.targets)) == 1:
                 block.stms.pop()
+                if scope.usedef:
+                    scope.usedef.remove_stm(stm)
                 block.append_stm(JUMP(stm.targets[0]))
                 block.succs = [stm.targets[0]]
                 stm.targets[0].preds = remove_except_one(stm.targets[0].preds, block)
@@ -74,7 +78,10 @@ class BlockReducer(object):
 
         pred.stms.pop()  # remove useless jump
         # merge stms
+        usedef = block.scope.usedef
         for stm in block.stms:
+            if usedef:
+                usedef.remove_stm(stm)
             pred.append_stm(stm)
 
         #deal with block links
@@ -160,7 +167,7 @@ class PathExpTracer(object):
                 exit_block = r.head.preds_loop[0]
             else:
                 exit_block = self.scope.exit_block
-            if blk in self.tree_builder.dominators[exit_block]:
+            if self.tree.is_dominator(blk, exit_block):
                 # This block will always be passed through
                 pass
             elif len(blk.preds) > 1:
@@ -437,7 +444,8 @@ class HyperBlockBuilder(object):
                 self.uddetector.visit(stm)
         for br in removes:
             old_jmp = br.stms[-1]
-            old_jmp.target = new_tail
+            if old_jmp.is_a(JUMP):
+                old_jmp.target = new_tail
             assert br in tail.preds
             tail.preds.remove(br)
             new_tail.preds.append(br)
@@ -531,8 +539,6 @@ class HyperBlockBuilder(object):
 
     def _transform_special_stms_for_speculation(self, head, path_exp, path_remain_stms):
         all_cstms = []
-        path_cstms = []
-        cstms = []
         for idx, stm in path_remain_stms:
             if stm.is_a(CMOVE) or stm.is_a(CEXPR):
                 cstm = stm
@@ -547,20 +553,14 @@ class HyperBlockBuilder(object):
             stm.block.stms.remove(stm)
             self.scope.usedef.remove_stm(stm)
             cstm.loc = stm.loc
-            cstms.append(cstm)
             all_cstms.append((idx, cstm))
             self.uddetector.visit(cstm)
-        path_cstms.append(cstms)
-        if len(path_cstms) > 1:
-            for i, cstms in enumerate(path_cstms):
-                nested_other_cstms = path_cstms[:i] + path_cstms[i + 1:]
-                for cstm in cstms:
-                    self.scope.add_branch_graph_edge(cstm, nested_other_cstms)
-
         return all_cstms
 
     def _merge_diamond_blocks(self, head, tail, branches):
         visited_path = set()
+        # the statements on different paths are executed exclusively
+        path_cstms = []
         for idx, path in enumerate(branches):
             assert tail is path[-1]
             if path[0] in visited_path:
@@ -586,4 +586,10 @@ class HyperBlockBuilder(object):
                 cstms_ = self._transform_special_stms_for_speculation(head, path_exp, remains_)
                 for _, stm in sorted(cstms_, key=lambda _: _[0]):
                     head.insert_stm(-1, stm)
+                path_cstms.append([stm for _, stm in cstms_])
+        if len(path_cstms) > 1:
+            for i, cstms in enumerate(path_cstms):
+                nested_other_cstms = path_cstms[:i] + path_cstms[i + 1:]
+                for cstm in cstms:
+                    self.scope.add_branch_graph_edge(cstm, nested_other_cstms)
         head.is_hyperblock = True
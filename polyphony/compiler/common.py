@@ -59,6 +59,13 @@ def warn(info, err_id, args=None):
     print('')
 
 
+def _tag_predicate(tag):
+    def is_tagged(self):
+        return tag in self.tags
+    is_tagged.__name__ = 'is_' + tag
+    return is_tagged
+
+
 class Tagged(object):
     __slots__ = ['tags']
 
@@ -71,14 +78,13 @@ class Tagged(object):
         self.tags = tags
         assert self.tags.issubset(self.TAGS)
 
-    def __getattr__(self, name):
-        if name.startswith('is_'):
-            tag = name[3:]
-            if tag not in self.TAGS:
-                raise AttributeError(name)
-            return lambda: tag in self.tags
-        else:
-            raise AttributeError(name)
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # define is_xxx() for each tag unless the class defines it by itself
+        for tag in cls.__dict__.get('TAGS', ()):
+            name = 'is_' + tag
+            if name not in cls.__dict__:
+                setattr(cls, name, _tag_predicate(tag))
 
     def add_tag(self, tag):
         if isinstance(tag, set):
@@ -0,0 +1,147 @@
+import hashlib
+import json
+import os
+from collections import namedtuple
+from .common import src_texts
+from .env import env
+from ..version import __version__
+
+
+# a testbench restored from the cache (env.testbenches holds the scopes otherwise)
+CachedTestbench = namedtuple('CachedTestbench', ('name', 'orig_name'))
+
+
+def _file_hash(filename):
+    with open(filename, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+class CompileCache(object):
+    '''
+    Content-addressed cache of the HDL modules generated for a source file.
+
+    An entry is looked up by the main source, the compiler version, the config
+    and the output options. It records the hash of every source file that was
+    read while compiling (the builtin libraries and all the imported modules),
+    so the entry is reused only if none of them has been changed.
+    The least recently used entries are evicted when the total size of the
+    cache exceeds max_size.
+    '''
+    DEFAULT_MAX_SIZE = 64 * 1024 * 1024
+
+    def __init__(self, cache_dir, max_size=None):
+        self.cache_dir = cache_dir
+        self.max_size = max_size if max_size else self.DEFAULT_MAX_SIZE
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _config_items(self):
+        config = {}
+        for k in dir(env.config):
+            if k.startswith('_'):
+                continue
+            v = getattr(env.config, k)
+            if callable(v):
+                continue
+            config[k] = v
+        return sorted(config.items())
+
+    def salt(self, options):
+        '''Returns the part of the key that does not depend on the source'''
+        return repr([
+            __version__,
+            self._config_items(),
+            options.verilog_dump,
+            options.verilog_monitor,
+        ])
+
+    def key(self, src_file, source, options):
+        h = hashlib.sha256()
+        items = [
+            self.salt(options),
+            os.path.dirname(os.path.abspath(src_file)),
+            source,
+        ]
+        for item in items:
+            h.update(item.encode('utf-8'))
+            h.update(b'\0')
+        return h.hexdigest()
+
+    def entry_path(self, key, ext='.json'):
+        return os.path.join(self.cache_dir, key + ext)
+
+    def _read_entry(self, key):
+        path = self.entry_path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        # update the access time for LRU eviction
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return entry
+
+    def _write_entry(self, key, entry):
+        path = self.entry_path(key)
+        tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+        with open(tmp_path, 'w') as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def load(self, key):
+        entry = self._read_entry(key)
+        if not entry:
+            return None
+        try:
+            for filename, digest in entry['deps'].items():
+                if not os.path.exists(filename) or _file_hash(filename) != digest:
+                    return None
+        except (OSError, KeyError):
+            return None
+        return entry
+
+    def store(self, key, modules, libs):
+        entry = {
+            'deps': {os.path.abspath(filename): _file_hash(filename) for filename in src_texts.keys()},
+            'modules': modules,
+            'libs': libs,
+        }
+        self._write_entry(key, entry)
+
+    def load_module(self, fingerprint):
+        '''Load the HDL of a module stored by the incremental compilation'''
+        entry = self._read_entry('m' + fingerprint)
+        if not entry or 'code' not in entry:
+            return None
+        return entry
+
+    def store_module(self, fingerprint, code, libs):
+        self._write_entry('m' + fingerprint, {'code': code, 'libs': libs})
+
+    def evict(self):
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(('.json', '.pickle')):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                # evicted by another process sharing the cache
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+        for _, size, path in sorted(entries):
+            if total <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
@@ -1,5 +1,4 @@
-﻿from collections import deque
-from .block import Block
+﻿from .block import Block
 from .common import fail
 from .errors import Errors
 from .irvisitor import IRVisitor, IRTransformer
@@ -253,13 +252,11 @@ class ConstantOpt(ConstantOptBase):
         self.scope = scope
         self.dtree = DominatorTreeBuilder(scope).process()
         dead_stms = []
-        worklist = deque()
+        worklist = Worklist()
         for blk in scope.traverse_blocks():
             worklist.extend(blk.stms)
         while worklist:
             stm = worklist.popleft()
-            while stm in worklist:
-                worklist.remove(stm)
             self.current_stm = stm
             self.visit(stm)
             if stm.is_a(PHIBase):
@@ -497,7 +494,7 @@ class PolyadConstantFolding(object):
             if len(defstms) != 1:
                 return
             usestms = self.scope.usedef.get_stms_using(ir.dst.symbol())
-            for usestm in usestms:
+            for usestm in usestms.copy():
                 if self._can_inlining(usestm, ir):
                     usestm.replace(TEMP(ir.dst.symbol(), Ctx.LOAD), ir.src)
 
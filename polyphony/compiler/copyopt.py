@@ -75,6 +75,7 @@ class CopyOpt(IRVisitor):
                 if cp.dst.is_a(ATTR) and cp.dst.tail().typ.get_scope().is_module() and scope.is_ctor():
                     continue
                 cp.block.stms.remove(cp)
+                scope.usedef.remove_stm(cp)
 
     def _find_root_def(self, qsym) -> IR:
         defs = list(self.scope.usedef.get_stms_defining(qsym))
@@ -15,8 +15,10 @@ class DFNode(object):
         self.begin = -1
         self.end = -1
         if typ == 'Stm':
-            self.stm_index = tag.block.stms.index(tag)
+            self.block_num = tag.block.num
+            self.stm_index = tag.block.stm_index(tag)
         else:
+            self.block_num = 0
             self.stm_index = 0
         self.instance_num = 0
         self.uses = []
@@ -56,9 +58,8 @@ class DFNode(object):
         return str(self)
 
     def __lt__(self, other):
-        if self.begin == other.begin:
-            return self.priority < other.priority
-        return self.begin < other.begin
+        return ((self.begin, self.priority, self.block_num, self.stm_index) <
+                (other.begin, other.priority, other.block_num, other.stm_index))
 
     def latency(self):
         return self.end - self.begin
@@ -174,7 +175,7 @@ class DataFlowGraph(object):
 
     def _stm_order_gt(self, stm1, stm2):
         if stm1.block is stm2.block:
-            return stm1.block.stms.index(stm1) > stm2.block.stms.index(stm2)
+            return stm1.block.stm_index(stm1) > stm2.block.stm_index(stm2)
         else:
             return stm1.block.order > stm2.block.order
 
@@ -576,7 +577,7 @@ class DFGBuilder(object):
         return all_stms_in_section
 
     def _node_order_by_ctrl(self, node):
-        return (node.tag.block.order, node.tag.block.num, node.tag.block.stms.index(node.tag))
+        return (node.tag.block.order, node.tag.block.num, node.tag.block.stm_index(node.tag))
 
     def _add_mem_edges(self, dfg):
         '''
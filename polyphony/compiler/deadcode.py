@@ -9,6 +9,7 @@ class DeadCodeEliminator(object):
         if scope.is_namespace() or scope.is_class():
             return
         usedef = scope.usedef
+        all_dead_stms = []
         for blk in scope.traverse_blocks():
             dead_stms = []
             for stm in blk.stms:
@@ -28,6 +29,7 @@ class DeadCodeEliminator(object):
                             break
                     else:
                         dead_stms.append(stm)
+            all_dead_stms.extend(dead_stms)
             for stm in dead_stms:
                 blk.stms.remove(stm)
                 logger.debug('removed dead code: ' + str(stm))
@@ -38,4 +40,7 @@ class DeadCodeEliminator(object):
                     var = stm.var
                 if var.is_a([TEMP, ATTR]) and var.symbol().typ.is_seq():
                     memnode = var.symbol().typ.get_memnode()
-                    env.memref_graph.remove_node(memnode)
\ No newline at end of file
+                    env.memref_graph.remove_node(memnode)
+        # the uses of the dead stms are removed after all blocks have been checked
+        for stm in all_dead_stms:
+            usedef.remove_stm(stm)
\ No newline at end of file
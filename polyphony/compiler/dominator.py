@@ -5,41 +5,74 @@ logger = getLogger(__name__)
 class DominatorTree(object):
     def __init__(self):
         self.nodes = []
-        self.edges = []
+        self.parents = {}
+        self.children = {}
+        self.orders = None
 
     def add_node(self, n):
-        if n not in self.nodes:
+        if n not in self.children:
             self.nodes.append(n)
+            self.children[n] = []
+            self.orders = None
 
     def add_edge(self, n1, n2):
-        edge = (n1, n2)
-        if edge not in self.edges:
-            self.edges.append(edge)
+        if self.parents.get(n2) is n1:
+            return
+        assert n2 not in self.parents
+        self.add_node(n1)
+        self.add_node(n2)
+        self.parents[n2] = n1
+        self.children[n1].append(n2)
+        self.orders = None
+
+    @property
+    def edges(self):
+        return [(self.parents[n], n) for n in self.nodes if n in self.parents]
 
     def get_parent_of(self, n):
         '''parent is immidiate dominator'''
-        for n1, n2 in self.edges:
-            if n2 is n:
-                return n1
-        return None
+        return self.parents.get(n)
 
     def get_children_of(self, n):
-        return [n2 for n1, n2 in self.edges if n1 is n]
+        return self.children.get(n, [])[:]
 
-    #is v dominator of n?
+    #is n dominator of v?
     def is_dominator(self, n, v):
         if n is v:
             return True
-        for c in self.get_children_of(n):
-            if self.is_dominator(c, v):
-                return True
-        return False
+        if self.orders is None:
+            self._set_orders()
+        if n not in self.orders or v not in self.orders:
+            return False
+        n_pre, n_post = self.orders[n]
+        v_pre, v_post = self.orders[v]
+        return n_pre < v_pre and v_post < n_post
 
     def is_child(self, n1, n2):
-        for _n1, _n2 in self.edges:
-            if _n1 is n1 and _n2 is n2:
-                return True
-        return False
+        return self.parents.get(n2) is n1
+
+    def _set_orders(self):
+        # pre-order and post-order numbers of the depth-first walk on the tree
+        self.orders = {}
+        pres = {}
+        count = 0
+        for root in self.nodes:
+            if root in self.parents:
+                continue
+            pres[root] = count
+            count += 1
+            stack = [(root, iter(self.children[root]))]
+            while stack:
+                n, children = stack[-1]
+                for c in children:
+                    pres[c] = count
+                    count += 1
+                    stack.append((c, iter(self.children[c])))
+                    break
+                else:
+                    stack.pop()
+                    self.orders[n] = (pres[n], count)
+                    count += 1
 
     def dump(self):
         logger.debug('dominator tree')
@@ -53,93 +86,159 @@ class DominatorTree(object):
 
 
 class DominatorTreeBuilder(object):
+    '''
+    Builds the dominator tree of the blocks with the algorithm of Cooper, Harvey and Kennedy.
+
+    Loop back edges are ignored. Blocks that are not reachable from the entry
+    but precede reachable blocks are dominated by a virtual root, so they do not
+    dominate any reachable block.
+    '''
     def __init__(self, scope):
         self.scope = scope
-        self.done_block_links = []
-        self.dominators = {}
 
     def process(self):
-        first_block = self.scope.entry_block
         self._fwd_blks = self._succs
         self._fwd_loop_blks = self._succs_loop
         self._back_blks = self._preds
         self._back_loop_blks = self._preds_loop
-
-        self.all_blocks = [blk for blk in self.scope.traverse_blocks()]
-        #collect dominators for each block
-        self._walk_block(first_block, self._visit_Block_find_dominator)
-
-        #build dominator tree
-        tree = DominatorTree()
-        for b, doms in self.dominators.items():
-            for dom in doms:
-                assert dom.order >= 0
-            domlist = sorted(list(doms))
-            assert b is domlist[-1]
-            if len(domlist) >= 2:
-                d1 = domlist[-2]  # immediate dominator
-                d2 = domlist[-1]  # block itself
-                tree.add_node(d1)
-                tree.add_node(d2)
-                tree.add_edge(d1, d2)
-        return tree
+        return self._build([self.scope.entry_block])
 
     def _succs(self, blk):
-        succs = []
-        for s in blk.succs:
-            succs.append(s)
-        return succs
+        return blk.succs
 
     def _succs_loop(self, blk):
         return blk.succs_loop
 
     def _preds(self, blk):
-        preds = []
-        for s in blk.preds:
-            preds.append(s)
-        return preds
+        return blk.preds
 
     def _preds_loop(self, blk):
         return blk.preds_loop
 
-    def _walk_block(self, block, visit_func):
-        self.done_block_links = []
-        self._walk_block_rec(block, visit_func)
+    def _fwd(self, blk):
+        loops = self._fwd_loop_blks(blk)
+        return [b for b in self._fwd_blks(blk) if b not in loops]
 
-    def _walk_block_rec(self, block, visit_func):
-        visit_func(block)
+    def _back(self, blk):
+        loops = self._back_loop_blks(blk)
+        return [b for b in self._back_blks(blk) if b not in loops]
 
-        #walk into successors
-        succs = self._fwd_blks(block)
-        for succ in succs:
-            if succ in self._fwd_loop_blks(block):
-                continue
-            #don't visit to already visited block
-            link = (block, succ)
-            if link in self.done_block_links:
+    def _collect_blocks(self, roots):
+        '''Returns the blocks reachable from the roots and all of them with their predecessors'''
+        reachables = set()
+        blocks = []
+        visited = set()
+
+        def add_with_preds(blk):
+            # predecessors come first
+            if blk in visited:
+                return
+            visited.add(blk)
+            stack = [(blk, iter(self._back(blk)))]
+            while stack:
+                b, preds = stack[-1]
+                for p in preds:
+                    if p not in visited:
+                        visited.add(p)
+                        stack.append((p, iter(self._back(p))))
+                        break
+                else:
+                    stack.pop()
+                    blocks.append(b)
+
+        for root in roots:
+            if root in reachables:
                 continue
-            self.done_block_links.append(link)
-
-            self._walk_block_rec(succ, visit_func)
-
-    def _visit_Block_find_dominator(self, block):
-        if block in self.dominators:
-            return self.dominators[block]
-
-        preds = self._back_blks(block)
-        if preds:
-            doms = set(self.all_blocks)
-            for p in preds:
-                if p in self._back_loop_blks(block):
-                    continue
-                ds = self._visit_Block_find_dominator(p)
-                doms = ds.intersection(doms)
-            doms.add(block)
-        else:
-            #It must be the super-src block
-            doms = set([block])
-        self.dominators[block] = doms
-        return doms
+            reachables.add(root)
+            add_with_preds(root)
+            stack = [iter(self._fwd(root))]
+            while stack:
+                for succ in stack[-1]:
+                    if succ not in reachables:
+                        reachables.add(succ)
+                        add_with_preds(succ)
+                        stack.append(iter(self._fwd(succ)))
+                        break
+                else:
+                    stack.pop()
+        return blocks, reachables
+
+    def _build(self, roots):
+        blocks, reachables = self._collect_blocks(roots)
+        domain = set(blocks)
+        # None is the virtual root that precedes the blocks without predecessors
+        preds = {None: []}
+        succs = {None: []}
+        for blk in blocks:
+            preds[blk] = self._back(blk)
+            succs[blk] = [b for b in self._fwd(blk) if b in domain]
+            if not preds[blk]:
+                preds[blk] = [None]
+                succs[None].append(blk)
+
+        # reverse post-order
+        rpo = []
+        visited = {None}
+        stack = [(None, iter(succs[None]))]
+        while stack:
+            n, ss = stack[-1]
+            for s in ss:
+                if s not in visited:
+                    visited.add(s)
+                    stack.append((s, iter(succs[s])))
+                    break
+            else:
+                stack.pop()
+                rpo.append(n)
+        rpo.reverse()
+        rpo_nums = {n: i for i, n in enumerate(rpo)}
+
+        def intersect(b1, b2):
+            while b1 is not b2:
+                while rpo_nums[b1] > rpo_nums[b2]:
+                    b1 = idoms[b1]
+                while rpo_nums[b2] > rpo_nums[b1]:
+                    b2 = idoms[b2]
+            return b1
+
+        idoms = {None: None}
+        changed = True
+        while changed:
+            changed = False
+            for n in rpo[1:]:
+                new_idom = None
+                first = True
+                for p in preds[n]:
+                    if p not in idoms:
+                        continue
+                    if first:
+                        new_idom = p
+                        first = False
+                    else:
+                        new_idom = intersect(p, new_idom)
+                if n not in idoms or idoms[n] is not new_idom:
+                    idoms[n] = new_idom
+                    changed = True
+
+        tree = DominatorTree()
+        for blk in blocks:
+            d = idoms[blk]
+            while d is not None and d not in reachables:
+                d = idoms[d]
+            if d is not None:
+                tree.add_edge(d, blk)
+        return tree
+
+
+class PostDominatorTreeBuilder(DominatorTreeBuilder):
+    '''Builds the post-dominator tree, the roots of which are the blocks without successors'''
+    def process(self):
+        self._fwd_blks = self._preds
+        self._fwd_loop_blks = self._preds_loop
+        self._back_blks = self._succs
+        self._back_loop_blks = self._succs_loop
+        sinks = [blk for blk in self.scope.traverse_blocks() if not self._back(blk)]
+        return self._build(sinks)
 
 
 class DominanceFrontierBuilder(object):
@@ -147,7 +246,15 @@ class DominanceFrontierBuilder(object):
         self.dominance_frontier = {}
 
     def process(self, block, tree):
-        self._compute_df(block, tree)
+        stack = [(block, iter(tree.get_children_of(block)))]
+        while stack:
+            blk, children = stack[-1]
+            for c in children:
+                stack.append((c, iter(tree.get_children_of(c))))
+                break
+            else:
+                stack.pop()
+                self._compute_df(blk, tree)
         return self.dominance_frontier
 
     def _compute_df(self, block, tree):
@@ -162,7 +269,6 @@ class DominanceFrontierBuilder(object):
             if tree.get_parent_of(succ) is not block:
                 result.add(succ)
         for c in tree.get_children_of(block):
-            self._compute_df(c, tree)
             for v in self.dominance_frontier[c]:
                 if not tree.is_dominator(block, v) or block is v:
                     result.add(v)
@@ -6,12 +6,13 @@ import logging
 
 
 class Driver(object):
-    def __init__(self, procs, scopes):
+    def __init__(self, procs, scopes, profiler=None):
         self.procs = procs
         self.scopes = scopes[:]
         self.disable_scopes = []
         self.logger = logging.getLogger()  # root logger
         self.codes = {}
+        self.profiler = profiler
 
     def insert_scope(self, scope):
         self.scopes.append(scope)
@@ -54,6 +55,15 @@ class Driver(object):
             self.logger.removeHandler(env.logfiles[scope])
 
     def run(self):
+        if self.profiler:
+            self.profiler.start()
+        try:
+            self._run()
+        finally:
+            if self.profiler:
+                self.profiler.stop()
+
+    def _run(self):
         while True:
             for i, proc in enumerate(self.procs):
                 if env.dev_debug_mode:
@@ -67,17 +77,27 @@ class Driver(object):
                 if 'scope' not in inspect.signature(proc).parameters:
                     for s in scopes:
                         self.start_logging(proc, s)
-                    proc(self)
+                    self.call_proc(proc, None, len(scopes))
                     for s in scopes:
                         self.end_logging(proc, s)
                 else:
                     for s in reversed(scopes):
                         self.start_logging(proc, s)
-                        proc(self, s)
+                        self.call_proc(proc, s, len(scopes))
                         self.end_logging(proc, s)
             else:
                 break
 
+    def call_proc(self, proc, scope, scope_count):
+        if self.profiler:
+            start = self.profiler.begin()
+        if scope:
+            proc(self, scope)
+        else:
+            proc(self)
+        if self.profiler:
+            self.profiler.end(start, self.stage, proc, scope, scope_count)
+
     def set_result(self, scope, code):
         self.codes[scope] = code
 
@@ -9,6 +9,12 @@ class Config(object):
     internal_ram_load_latency = 3
     internal_ram_store_latency = 1
     enable_pure = False
+    # the maximum number of the functional units that can be used at the same time,
+    # e.g. {"Mult": 2, "FloorDiv": 1} (an operator name or the name of a function module)
+    resource_limits = {}
+    # the clock period (ns) within which the operations are chained in a state, e.g. 10.0
+    # (if it is None, the chaining is not bounded by the operator delays)
+    clock_period = None
 
     def __str__(self):
         d = {}
@@ -44,6 +50,7 @@ class Env(object):
     quiet_level = 0
     enable_verilog_monitor = False
     enable_verilog_dump = False
+    jobs = 1
 
     def __init__(self):
         self.call_graph = None
@@ -52,7 +59,7 @@ class Env(object):
         self.all_scopes = {}
         self.compile_phase = 0
         self.logfiles = {}
-        self.using_libs = set()
+        self.using_libs = []
         self.memref_graph = None
         self.scope_file_map = {}
         self.current_filename = None
@@ -62,6 +69,13 @@ class Env(object):
         self.outermost_scope_stack = []
         self.hdlmodules = []
         self.scope2module = {}
+        self.incremental = None
+        self.lib_cache = None
+        # all symbols and the next scope id of the compilation
+        self.all_symbols = []
+        self.scope_id = 0
+        # incremented whenever the scopes or the scope hierarchy change
+        self.scopes_version = 0
 
     def load_config(self, config):
         for key, v in config.items():
@@ -74,6 +88,7 @@ class Env(object):
         self.scope_file_map[scope] = self.current_filename
         self.scopes[scope.name] = scope
         self.all_scopes[scope.name] = scope
+        self.scopes_version += 1
         if self.dev_debug_mode and (not scope.is_lib() and not scope.is_inlinelib()):
             logfile = logging.FileHandler('{}/debug_log.{}'.format(env.debug_output_dir, scope.name.replace('@', '')) , 'w')
             self.logfiles[scope] = logfile
@@ -81,12 +96,29 @@ class Env(object):
     def destroy(self):
         for logfile in self.logfiles.values():
             logfile.close()
+        self.logfiles = {}
+        # release the symbols and scopes of the compilation
+        # (the testbenches and the used libraries are left as the results)
+        self.all_symbols = []
+        self.scopes = {}
+        self.all_scopes = {}
+        self.scopes_version += 1
+        self.scope_file_map = {}
+        self.call_graph = None
+        self.depend_graph = None
+        self.memref_graph = None
+        self.outermost_scope_stack = []
+        self.hdlmodules = []
+        self.scope2module = {}
+        self.runtime_info = None
 
     def remove_scope(self, scope):
         del self.scopes[scope.name]
+        self.scopes_version += 1
 
     def add_using_lib(self, lib):
-        self.using_libs.add(lib)
+        if lib not in self.using_libs:
+            self.using_libs.append(lib)
 
     def append_testbench(self, testbench):
         self.testbenches.append(testbench)
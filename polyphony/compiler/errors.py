@@ -93,6 +93,10 @@ class Errors(Enum):
     RULE_READING_PIPELINE_IS_CONFLICTED = 1105
     RULE_WRITING_PIPELINE_IS_CONFLICTED = 1106
     RULE_PIPELINE_CANNNOT_FLATTEN = 1107
+    RULE_INVALID_RESOURCES = 1108
+    RULE_INVALID_RESOURCE_LIMIT = 1109
+    RULE_INVALID_CLOCK_PERIOD = 1110
+    RULE_PIPELINE_BREAKS_RECURRENCE = 1111
 
     RULE_UNROLL_NESTED_LOOP = 1151
     RULE_UNROLL_UNFIXED_LOOP = 1152
@@ -192,6 +196,10 @@ ERROR_MESSAGES = {
     Errors.RULE_READING_PIPELINE_IS_CONFLICTED: "Reading from '{}' is conflicted in a pipeline",
     Errors.RULE_WRITING_PIPELINE_IS_CONFLICTED: "Writing to '{}' is conflicted in a pipeline",
     Errors.RULE_PIPELINE_CANNNOT_FLATTEN: "Flattening of multiple inner loops in a pipeline loop is not supported",
+    Errors.RULE_INVALID_RESOURCES: "Invalid resources '{}', it must be like 'Mult:2,FloorDiv:1'",
+    Errors.RULE_INVALID_RESOURCE_LIMIT: "Invalid resource limit {} of '{}' in the config, it must be a positive integer",
+    Errors.RULE_INVALID_CLOCK_PERIOD: "Invalid clock period {} in the config, it must be a positive number of nanoseconds",
+    Errors.RULE_PIPELINE_BREAKS_RECURRENCE: "The loop-carried dependency of the pipeline cannot be satisfied with II={}",
 
     Errors.RULE_UNROLL_NESTED_LOOP: "Cannot unroll nested loop",
     Errors.RULE_UNROLL_UNFIXED_LOOP: "Cannot full unroll unfixed loop",
@@ -3,11 +3,12 @@ import copy
 
 
 class SimpleOrderedSet(object):
+    # key -> key; a dict keeps the insertion order
     def __init__(self, items=None):
-        if items is None:
-            items = []
-        self.__items = set(items)
-        self.__orders = list(items)
+        self.__items = {}
+        if items is not None:
+            for item in items:
+                self.__items.setdefault(item, item)
 
     def __len__(self):
         return len(self.__items)
@@ -16,56 +17,51 @@ class SimpleOrderedSet(object):
         return key in self.__items
 
     def copy(self):
-        return copy.copy(self)
+        return SimpleOrderedSet(self.__items)
 
     def add(self, key):
-        if key not in self.__items:
-            self.__items.add(key)
-            self.__orders.append(key)
+        self.__items.setdefault(key, key)
 
     def discard(self, key):
-        if key in self.__items:
-            self.__items.discard(key)
-            self.__orders.remove(key)
+        self.__items.pop(key, None)
 
     def __iter__(self):
-        return iter(self.__orders)
+        return iter(self.__items)
 
     def __reversed__(self):
-        return reversed(self.__orders)
+        return reversed(list(self.__items))
 
     def pop(self, last=True):
         if not self.__items:
             raise KeyError('set is empty')
-        key = self.__orders.pop()
-        self.__items.discard(key)
+        key, _ = self.__items.popitem()
         return key
 
     def union(self, other):
-        return SimpleOrderedSet(self.__orders + other.orders())
+        return SimpleOrderedSet(self.orders() + other.orders())
 
     def intersection(self, other):
-        items = []
-        for item0 in self.__orders:
-            for item1 in other.orders():
-                if item0 is item1:
-                    items.append(item0)
-                    break
+        if not isinstance(other, SimpleOrderedSet):
+            other = SimpleOrderedSet(other)
+        items = [item for item in self.__items if other._find(item) is item]
         return SimpleOrderedSet(items)
 
+    def _find(self, key):
+        return self.__items.get(key)
+
     def items(self):
-        return self.__items.copy()
+        return set(self.__items)
 
     def orders(self):
-        return self.__orders.copy()
+        return list(self.__items)
 
     def __repr__(self):
         if not self:
             return '{}()'.format(self.__class__.__name__,)
-        return '{}({})'.format(self.__class__.__name__, self.__orders)
+        return '{}({})'.format(self.__class__.__name__, list(self.__items))
 
     def __eq__(self, other):
-        return isinstance(other, SimpleOrderedSet) and self.__orders == other.__orders
+        return isinstance(other, SimpleOrderedSet) and list(self.__items) == list(other.__items)
 
 
 Edge = namedtuple('Edge', ('src', 'dst', 'flags'))
@@ -76,9 +72,14 @@ class Graph(object):
         self.succ_nodes = defaultdict(SimpleOrderedSet)
         self.pred_nodes = defaultdict(SimpleOrderedSet)
         self.edges = SimpleOrderedSet()
+        # (src, dst) -> edges in the order of addition
+        self.edge_map = {}
+        self.node_edges = defaultdict(dict)
         self.nodes = SimpleOrderedSet()
         self.order_map_cache = None
         self.is_dag_cache = None
+        # incremented on every change of the nodes or the edges
+        self.version = 0
 
     def __str__(self):
         s = 'Nodes\n'
@@ -93,14 +94,16 @@ class Graph(object):
         return len(self.nodes)
 
     def add_node(self, node):
-        node.g = self
-        self.nodes.add(node)
+        if node not in self.nodes:
+            self.nodes.add(node)
+            self.version += 1
 
     def del_node(self, node):
         self.nodes.discard(node)
-        for edge in set(self.edges):
-            if edge.src is node or edge.dst is node:
-                self.del_edge(edge.src, edge.dst, auto_del_node=False)
+        self.version += 1
+        for edge in list(self.node_edges[node]):
+            self.del_edge(edge.src, edge.dst, auto_del_node=False)
+        del self.node_edges[node]
 
     def has_node(self, node):
         return node in self.nodes
@@ -113,28 +116,41 @@ class Graph(object):
         self.add_node(dst_node)
         self.succ_nodes[src_node].add(dst_node)
         self.pred_nodes[dst_node].add(src_node)
-        self.edges.add(Edge(src_node, dst_node, flags))
+        edge = Edge(src_node, dst_node, flags)
+        if edge not in self.edges:
+            self.edges.add(edge)
+            self.edge_map.setdefault((src_node, dst_node), []).append(edge)
+            self.node_edges[src_node][edge] = None
+            self.node_edges[dst_node][edge] = None
         self.order_map_cache = None
         self.is_dag_cache = None
+        self.version += 1
 
     def del_edge(self, src_node, dst_node, auto_del_node=True):
         self.succ_nodes[src_node].discard(dst_node)
         self.pred_nodes[dst_node].discard(src_node)
-        edge = self.find_edge(src_node, dst_node)
-        assert edge
+        key = (src_node, dst_node)
+        edges = self.edge_map.get(key)
+        assert edges
+        edge = edges.pop(0)
+        if not edges:
+            del self.edge_map[key]
         self.edges.discard(edge)
+        self.node_edges[src_node].pop(edge, None)
+        self.node_edges[dst_node].pop(edge, None)
         if auto_del_node:
             if not self.succs(src_node) and not self.preds(src_node):
                 self.nodes.discard(src_node)
             if not self.succs(dst_node) and not self.preds(dst_node):
                 self.nodes.discard(dst_node)
         self.order_map_cache = None
+        self.version += 1
         self.is_dag_cache = None
 
     def find_edge(self, src_node, dst_node):
-        for edge in self.edges:
-            if edge.src is src_node and edge.dst is dst_node:
-                return edge
+        edges = self.edge_map.get((src_node, dst_node))
+        if edges:
+            return edges[0]
         return None
 
     def succs(self, node):
@@ -150,19 +166,6 @@ class Graph(object):
         return [n for n in self.nodes if not self.succs(n)]
 
     def node_order_map(self, is_breadth_first):
-        def set_order(pred, n, bf_order, df_order, visited_edges):
-            if (pred, n) in visited_edges:
-                return df_order
-            visited_edges.add((pred, n))
-            if bf_order > bf_order_map[n]:
-                bf_order_map[n] = bf_order
-            if df_order > df_order_map[n]:
-                df_order_map[n] = df_order
-            bf_order += 1
-            df_order += 1
-            for succ in self.succs(n):
-                df_order = set_order(n, succ, bf_order, df_order, visited_edges)
-            return df_order
         if self.order_map_cache:
             if is_breadth_first:
                 return self.order_map_cache[0]
@@ -175,13 +178,43 @@ class Graph(object):
             df_order_map[n] = -1
         visited_edges = set()
         for source in self.collect_sources():
-            set_order(None, source, 0, 0, visited_edges)
+            self._set_order(source, bf_order_map, df_order_map, visited_edges)
         self.order_map_cache = bf_order_map, df_order_map
         if is_breadth_first:
             return bf_order_map
         else:
             return df_order_map
 
+    def _set_order(self, source, bf_order_map, df_order_map, visited_edges):
+        # Each node gets the deepest breadth-first level and the latest depth-first
+        # count of the paths that reach it, walking every edge once.
+        # The walk uses an explicit stack to not hit the recursion limit.
+        def visit(pred, n, bf_order, df_order):
+            if (pred, n) in visited_edges:
+                return False
+            visited_edges.add((pred, n))
+            if bf_order > bf_order_map[n]:
+                bf_order_map[n] = bf_order
+            if df_order > df_order_map[n]:
+                df_order_map[n] = df_order
+            # [node, bf_order of succs, df_order, succs iterator]
+            stack.append([n, bf_order + 1, df_order + 1, iter(self.succs(n))])
+            return True
+
+        stack = []
+        visit(None, source, 0, 0)
+        while stack:
+            frame = stack[-1]
+            n, bf_order, df_order, succs = frame
+            for succ in succs:
+                if visit(n, succ, bf_order, df_order):
+                    break
+            else:
+                stack.pop()
+                if stack:
+                    # return the df_order to the caller
+                    stack[-1][2] = df_order
+
     # bfs(breadth-first-search)
     def bfs_ordered_nodes(self):
         order_map = self.node_order_map(is_breadth_first=True)
@@ -233,9 +266,10 @@ class Graph(object):
 
     def _extract_sccs(self, ordered_nodes):
         sccs = []
-        for scc in self._find_scc(ordered_nodes[:]):
+        for scc in self._find_scc(ordered_nodes):
             if len(scc) > 1:
                 # we have to keep the depth-first-search order
+                scc = set(scc)
                 nodes = [n for n in ordered_nodes if n in scc]
                 sccs.append(nodes)
             elif len(scc) == 1 and scc[0] in self.preds(scc[0]):
@@ -244,22 +278,31 @@ class Graph(object):
         return sccs
 
     def _find_scc(self, nodes):
+        # Walk back along the preds from the nodes in reversed order, like the second
+        # pass of Kosaraju's algorithm. Every node and every edge is visited once.
+        remains = set(nodes)
         sccs = []
-        visited = []
-        while nodes:
-            node = nodes[-1]
+        for node in reversed(nodes):
+            if node not in remains:
+                continue
             scc = []
-            self._find_scc_back_walk(node, nodes, visited, scc)
+            self._find_scc_back_walk(node, remains, scc)
             sccs.append(scc)
         return sccs
 
-    def _find_scc_back_walk(self, node, nodes, visited, scc):
+    def _find_scc_back_walk(self, node, remains, scc):
+        remains.discard(node)
         scc.append(node)
-        visited.append(node)
-        nodes.remove(node)
-        for pred in self.preds(node):
-            if pred not in visited and pred in nodes:
-                self._find_scc_back_walk(pred, nodes, visited, scc)
+        stack = [iter(self.preds(node))]
+        while stack:
+            for pred in stack[-1]:
+                if pred in remains:
+                    remains.discard(pred)
+                    scc.append(pred)
+                    stack.append(iter(self.preds(pred)))
+                    break
+            else:
+                stack.pop()
 
 
 def test_graph():
@@ -285,5 +328,66 @@ def test_graph():
     print(sccs)
 
 
+def bench_graph(num_nodes=10000, num_edges=100000):
+    import random
+    import time
+
+    class Node(object):
+        def __init__(self, i):
+            self.i = i
+
+        def __repr__(self):
+            return 'n{}'.format(self.i)
+
+    rand = random.Random(0)
+    nodes = [Node(i) for i in range(num_nodes)]
+    pairs = set()
+    while len(pairs) < num_edges:
+        pairs.add((rand.randrange(num_nodes), rand.randrange(num_nodes)))
+    pairs = [(nodes[i], nodes[j]) for i, j in sorted(pairs)]
+
+    g = Graph()
+    t = time.perf_counter()
+    for src, dst in pairs:
+        g.add_edge(src, dst)
+    print('add_edge  {:8.3f}s {} edges'.format(time.perf_counter() - t, len(pairs)))
+
+    samples = rand.sample(pairs, num_edges // 10)
+    t = time.perf_counter()
+    for src, dst in samples:
+        assert g.find_edge(src, dst)
+    print('find_edge {:8.3f}s {} edges'.format(time.perf_counter() - t, len(samples)))
+
+    t = time.perf_counter()
+    for src, dst in samples:
+        g.del_edge(src, dst, auto_del_node=False)
+    print('del_edge  {:8.3f}s {} edges'.format(time.perf_counter() - t, len(samples)))
+
+    victims = rand.sample(nodes, num_nodes // 100)
+    t = time.perf_counter()
+    for n in victims:
+        g.del_node(n)
+    print('del_node  {:8.3f}s {} nodes'.format(time.perf_counter() - t, len(victims)))
+
+    t = time.perf_counter()
+    sccs = g.extract_sccs()
+    print('extract_sccs {:5.3f}s {} sccs'.format(time.perf_counter() - t, len(sccs)))
+
+    # a long cycle is deeper than the recursion limit
+    ring = Graph()
+    for i in range(num_nodes):
+        ring.add_edge(nodes[i], nodes[(i + 1) % num_nodes])
+    ring.add_edge(Node(-1), nodes[0])
+    t = time.perf_counter()
+    sccs = ring.extract_sccs()
+    assert len(sccs) == 1 and len(sccs[0]) == num_nodes
+    assert not ring.is_dag()
+    print('extract_sccs {:5.3f}s {} nodes in a cycle'.format(time.perf_counter() - t, num_nodes))
+
+
 if __name__ == '__main__':
-    test_graph()
+    import sys
+    if len(sys.argv) > 1 and sys.argv[1] == 'bench':
+        bench_graph()
+    else:
+        test_graph()
@@ -0,0 +1,293 @@
+import hashlib
+from collections import deque
+from .block import Block
+from .env import env
+from .ir import IR
+from .irvisitor import IRVisitor
+from .memref import RefNode
+from .scope import Scope
+from .symbol import Symbol
+from .type import Type
+from . import libs
+
+
+class ScopeHasher(IRVisitor):
+    '''
+    Computes the fingerprint of a scope from a canonical form of its IR.
+
+    Temporary symbols are numbered in order of appearance instead of
+    using their names, so that the fingerprint does not depend on how
+    many symbols were created before this scope.
+    '''
+    def __init__(self):
+        super().__init__()
+
+    def process(self, scope):
+        self.scope = scope
+        self.hash = hashlib.sha256()
+        self.temps = {}
+        self.block_ids = {}
+        self.ports = set()
+        blocks = list(scope.traverse_blocks()) if scope.entry_block else []
+        for i, blk in enumerate(blocks):
+            self.block_ids[blk] = i
+        self._emit('scope', scope.name, sorted(scope.tags))
+        for p, cp, defval in scope.params:
+            self._emit('param', self._sym_key(p), self._sym_key(cp), str(defval) if defval else '')
+        if scope.return_type:
+            self._emit('return', self._value_key(scope.return_type))
+        self._emit('synth', sorted(scope.synth_params.items()))
+        for blk in blocks:
+            self._emit('block',
+                       self.block_ids[blk],
+                       [self.block_ids.get(b, -1) for b in blk.succs],
+                       [self.block_ids.get(b, -1) for b in blk.succs_loop],
+                       sorted(blk.synth_params.items()),
+                       blk.is_hyperblock)
+            self._process_block(blk)
+        if scope.is_class():
+            for name, sym in sorted(scope.symbols.items()):
+                self._emit('field', self._sym_key(sym))
+        return self.hash.hexdigest()
+
+    def _emit(self, *items):
+        self.hash.update(repr(items).encode('utf-8'))
+        self.hash.update(b'\n')
+
+    def _sym_key(self, sym):
+        if sym.scope is self.scope and 'temp' in sym.tags:
+            if sym not in self.temps:
+                self.temps[sym] = '${}'.format(len(self.temps))
+                self._emit('temp', self.temps[sym], self._value_key(sym.typ))
+            return self.temps[sym]
+        if sym.typ.is_port():
+            self.ports.add(sym.name)
+        if sym.scope is self.scope:
+            return sym.name
+        key = '{}.{}'.format(sym.scope.name, sym.name)
+        if sym.scope.is_namespace() and sym in sym.scope.constants:
+            return (key, str(sym.scope.constants[sym]))
+        return key
+
+    def _value_key(self, v):
+        if isinstance(v, Type):
+            return (v.name, tuple([(k, self._value_key(a)) for k, a in sorted(v.attrs.items())]))
+        elif isinstance(v, Symbol):
+            return self._sym_key(v)
+        elif isinstance(v, Scope):
+            return v.name
+        elif isinstance(v, Block):
+            return self.block_ids.get(v, -1)
+        elif isinstance(v, RefNode):
+            return (v.__class__.__name__, self._sym_key(v.sym), v.flags,
+                    getattr(v, 'length', -1),
+                    tuple([self._sym_key(n.sym) for n in v.preds]),
+                    tuple([self._sym_key(n.sym) for n in v.succs]))
+        elif isinstance(v, IR):
+            return v.__class__.__name__
+        elif isinstance(v, (list, tuple)):
+            return tuple([self._value_key(item) for item in v])
+        elif isinstance(v, dict):
+            return tuple([(k, self._value_key(item)) for k, item in sorted(v.items())])
+        else:
+            return repr(v)
+
+    def visit(self, ir):
+        attrs = []
+        for k, v in sorted(ir.field_items()):
+            if k == 'block':
+                continue
+            if isinstance(v, IR):
+                continue
+            if isinstance(v, list) and v and isinstance(v[0], IR):
+                continue
+            attrs.append((k, self._value_key(v)))
+        self._emit(ir.__class__.__name__, attrs)
+        return super().visit(ir)
+
+    def visit_TEMP(self, ir):
+        self._value_key(ir.sym.typ)
+
+    def visit_ATTR(self, ir):
+        self.visit(ir.exp)
+        self._value_key(ir.attr.typ)
+
+
+def module_libs(hdlmodule):
+    '''Collect the library modules that is instantiated in the hdlmodule'''
+    names = set()
+    for _, sub_module, _, _ in hdlmodule.sub_modules.values():
+        names.add(sub_module.qualified_name)
+    using_libs = []
+    if 'BidirectionalSinglePortRam' in names:
+        using_libs.append(libs.bidirectional_single_port_ram)
+    if 'FIFO' in names:
+        using_libs.append(libs.fifo)
+    return using_libs
+
+
+class IncrementalCompile(object):
+    '''
+    Reuses the HDL generated in the previous compilation for the scopes
+    whose fingerprint has not changed.
+
+    The fingerprint of an HDL module is made from its own scopes (the module
+    class, its constructor and its workers, or a function module or testbench),
+    the scopes reachable from them in env.depend_graph and env.call_graph,
+    and the interfaces of the other HDL modules used by them.
+    Since an HDL module that is rebuilt needs the HDLModule of every module it
+    instantiates, those are rebuilt too even if their fingerprint is unchanged.
+    '''
+    def __init__(self, cache, salt):
+        self.cache = cache
+        self.salt = salt
+        self.fingerprints = {}
+        self.reused = []
+
+    def _owner(self, scope):
+        if scope.is_function_module() or scope.is_testbench():
+            owner = scope
+        elif scope.is_ctor() and scope.parent.is_module():
+            owner = scope.parent
+        elif scope.is_worker() and scope.worker_owner:
+            owner = scope.worker_owner
+        else:
+            return None
+        if owner.is_module() and not owner.is_instantiated():
+            return None
+        return owner
+
+    def _owned_scopes(self, owner):
+        if owner.is_module():
+            scopes = [owner]
+            ctor = owner.find_ctor()
+            if ctor:
+                scopes.append(ctor)
+            scopes.extend([w for w, _ in owner.workers])
+            return scopes
+        return [owner]
+
+    def _reachable(self, scopes, owners):
+        '''Returns non-owner scopes and other owners reachable from the scopes'''
+        visited = set(scopes)
+        deps = []
+        used_owners = set()
+        worklist = deque(scopes)
+        while worklist:
+            s = worklist.popleft()
+            succs = []
+            for g in (env.depend_graph, env.call_graph):
+                if g and g.has_node(s):
+                    succs.extend(g.succs(s))
+            for succ in succs:
+                if succ in visited:
+                    continue
+                visited.add(succ)
+                owner = owners.get(succ)
+                if owner:
+                    if owner not in scopes:
+                        used_owners.add(owner)
+                    continue
+                if succ.is_namespace():
+                    # referenced symbols of namespaces are hashed by ScopeHasher
+                    continue
+                deps.append(succ)
+                worklist.append(succ)
+        return deps, used_owners
+
+    def _interface(self, owner, local_fps, ports):
+        if owner.is_module():
+            ctor = owner.find_ctor()
+            items = [local_fps[owner], local_fps[ctor] if ctor else '',
+                     repr(getattr(owner, 'module_param_vars', None))]
+            for w, _ in owner.workers:
+                items.append((w.name, sorted(ports[w])))
+            return repr(items)
+        h = ScopeHasher()
+        h.process(owner)
+        # params and return type of the function
+        params = [(h._sym_key(p), h._value_key(p.typ)) for p, _, _ in owner.params]
+        return repr((owner.name, params, h._value_key(owner.return_type)))
+
+    def process_all(self, driver):
+        owners = {}
+        for s in driver.scopes:
+            owner = self._owner(s)
+            if owner:
+                for o in self._owned_scopes(owner):
+                    owners[o] = owner
+        local_fps = {}
+        ports = {}
+        for s in set(owners.keys()):
+            hasher = ScopeHasher()
+            local_fps[s] = hasher.process(s)
+            ports[s] = hasher.ports
+        uses = {}
+        fingerprints = {}
+        for owner in set(owners.values()):
+            scopes = self._owned_scopes(owner)
+            deps, used_owners = self._reachable(scopes, owners)
+            uses[owner] = used_owners
+            h = hashlib.sha256(self.salt.encode('utf-8'))
+            for s in scopes:
+                h.update(local_fps[s].encode('utf-8'))
+            for fp in sorted([ScopeHasher().process(d) for d in deps if not d.is_lib()]):
+                h.update(fp.encode('utf-8'))
+            for used in sorted(used_owners, key=lambda o: o.name):
+                h.update(self._interface(used, local_fps, ports).encode('utf-8'))
+            fingerprints[owner] = h.hexdigest()
+
+        entries = {}
+        rebuilds = set()
+        for owner, fp in fingerprints.items():
+            entry = self.cache.load_module(fp)
+            if entry:
+                entries[owner] = entry
+            else:
+                rebuilds.add(owner)
+        # unknown scopes are always rebuilt
+        for s in driver.scopes:
+            if s not in owners:
+                _, used_owners = self._reachable([s], owners)
+                rebuilds |= used_owners
+        # the memory ports of a function module are connected by its callers
+        groups = []
+        for owner in fingerprints.keys():
+            if any([p.typ.is_seq() for p, _, _ in owner.params]):
+                groups.append(set([o for o in fingerprints.keys() if owner in uses[o]] + [owner]))
+        while True:
+            for group in groups:
+                if rebuilds & group:
+                    rebuilds |= group
+            # a rebuilt module needs the HDLModule of the modules it uses
+            num_rebuilds = len(rebuilds)
+            worklist = deque(rebuilds)
+            while worklist:
+                owner = worklist.popleft()
+                for used in uses.get(owner, ()):
+                    if used not in rebuilds:
+                        rebuilds.add(used)
+                        worklist.append(used)
+            if len(rebuilds) == num_rebuilds:
+                break
+
+        for owner, fp in fingerprints.items():
+            if owner in rebuilds:
+                self.fingerprints[owner] = fp
+                continue
+            entry = entries[owner]
+            for s in self._owned_scopes(owner):
+                driver.remove_scope(s)
+            driver.set_result(owner, entry['code'])
+            for lib in entry['libs']:
+                env.add_using_lib(lib)
+            self.reused.append(owner)
+
+    def store(self, driver, scope):
+        if scope not in self.fingerprints:
+            return
+        code = driver.result(scope)
+        if not code:
+            return
+        hdlmodule = env.hdlmodule(scope)
+        self.cache.store_module(self.fingerprints[scope], code, module_libs(hdlmodule))
@@ -298,7 +298,7 @@ class AliasReplacer(CopyOpt):
                     elif ir.exp.qualified_symbol() == qsym:
                         vars.append(ir.exp)
                 else:
-                    for k, v in ir.__dict__.items():
+                    for k, v in ir.field_items():
                         find_vars_rec(v, qsym, vars)
             elif isinstance(ir, list) or isinstance(ir, tuple):
                 for elm in ir:
@@ -398,7 +398,8 @@ class FlattenFieldAccess(IRTransformer):
             return ir
         qsym = self._make_flatten_qsym(ir)
         newattr = self._make_new_ATTR(qsym, ir)
-        newattr.attr_scope = ir.attr_scope
+        if newattr.is_a(ATTR):
+            newattr.attr_scope = ir.attr_scope
         return newattr
 
 
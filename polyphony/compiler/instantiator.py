@@ -18,12 +18,12 @@ def bind_val(scope, i, value):
 class EarlyWorkerInstantiator(object):
     def process_all(self):
         assert env.config.enable_pure
-        new_workers = set()
+        new_workers = []
         orig_workers = set()
         for name, inst in env.runtime_info.module_instances.items():
             new_worker, orig_worker = self._process_workers(name, inst)
             if new_worker:
-                new_workers = new_workers | new_worker
+                new_workers.extend(new_worker)
                 orig_workers = orig_workers | orig_worker
         return new_workers, orig_workers
 
@@ -37,15 +37,16 @@ class EarlyWorkerInstantiator(object):
         if not module:
             return None, None
 
-        new_workers = set()
+        new_workers = []
         orig_workers = set()
         for worker in instance._workers:
             new_worker, orig_worker = self._instantiate_worker(worker, name, module)
-            new_workers.add(new_worker)
+            new_workers.append(new_worker)
             module.register_worker(new_worker, [])
             orig_workers.add(orig_worker)
             if orig_worker in module.children:
                 module.children.remove(orig_worker)
+                env.scopes_version += 1
         return new_workers, orig_workers
 
     def _instantiate_worker(self, worker, inst_name, module):
@@ -70,7 +71,7 @@ class EarlyWorkerInstantiator(object):
                     binding.append((bind_val, i, arg))
             else:
                 pass
-        idstr = utils.id2str(Scope.scope_id)
+        idstr = utils.id2str(env.scope_id)
         if binding:
             # FIXME: use scope-id instead of lineno
             postfix = '{}_{}'.format(idstr,
@@ -97,12 +98,12 @@ class EarlyWorkerInstantiator(object):
 class EarlyModuleInstantiator(object):
     def process_all(self):
         assert env.config.enable_pure
-        new_modules = set()
+        new_modules = []
         for name, inst in env.runtime_info.module_instances.items():
             new_module, orig_module = self._instantiate_module(name, inst)
             if new_module:
                 env.runtime_info.inst2module[new_module.instance] = (new_module, orig_module)
-                new_modules.add(new_module)
+                new_modules.append(new_module)
         return new_modules
 
     def _instantiate_module(self, inst_name, instance):
@@ -165,25 +166,25 @@ class WorkerInstantiator(object):
         return new_workers
 
     def _process_global_module(self):
-        new_workers = set()
+        new_workers = []
         collector = CallCollector()
         #g = Scope.global_scope()
         #calls = collector.process(g)
-        calls = set()
+        calls = {}
         scopes = Scope.get_scopes(bottom_up=False,
                                   with_global=True,
                                   with_class=False,
                                   with_lib=False)
         for s in scopes:
             if s.is_global() or s.is_function_module():
-                calls |= collector.process(s)
+                calls.update(collector.process(s))
         for stm, call in calls:
             if call.is_a(NEW) and call.func_scope().is_module() and not call.func_scope().find_ctor().is_pure():
-                new_workers = new_workers | self._process_workers(call.func_scope())
+                new_workers.extend(self._process_workers(call.func_scope()))
         return new_workers
 
     def _process_workers(self, module):
-        new_workers = set()
+        new_workers = []
         collector = CallCollector()
         ctor = module.find_ctor()
         calls = collector.process(ctor)
@@ -193,7 +194,7 @@ class WorkerInstantiator(object):
                 module.register_worker(new_worker, call.args)
                 if not is_created:
                     continue
-                new_workers.add(new_worker)
+                new_workers.append(new_worker)
                 new_worker_sym = module.add_sym(new_worker.orig_name,
                                                 typ=Type.function(new_worker, None, None))
                 _, w = call.args[0]
@@ -223,7 +224,7 @@ class WorkerInstantiator(object):
             else:
                 pass
 
-        idstr = utils.id2str(Scope.scope_id)
+        idstr = utils.id2str(env.scope_id)
         if worker.is_instantiated():
             new_worker = worker
         else:
@@ -261,21 +262,21 @@ class ModuleInstantiator(object):
 
     def _process_global_module(self):
         collector = CallCollector()
-        new_modules = set()
+        new_modules = []
         #g = Scope.global_scope()
         #calls = collector.process(g)
-        calls = set()
+        calls = {}
         scopes = Scope.get_scopes(bottom_up=False,
                                   with_global=True,
                                   with_class=False,
                                   with_lib=False)
         for s in scopes:
             if s.is_global() or s.is_function_module():
-                calls |= collector.process(s)
+                calls.update(collector.process(s))
         for stm, call in calls:
             if call.is_a(NEW) and call.func_scope().is_module() and not call.func_scope().is_instantiated():
                 new_module = self._instantiate_module(call, stm.dst)
-                new_modules.add(new_module)
+                new_modules.append(new_module)
                 stm.dst.symbol().set_type(Type.object(new_module))
         return new_modules
 
@@ -357,14 +358,15 @@ class MemnodeReplacer(IRVisitor):
 class CallCollector(IRVisitor):
     def __init__(self):
         super().__init__()
-        self.calls = set()
+        # (stm, call) -> None, in the order of appearance
+        self.calls = {}
 
     def process(self, scope):
         super().process(scope)
         return self.calls
 
     def visit_CALL(self, ir):
-        self.calls.add((self.current_stm, ir))
+        self.calls[(self.current_stm, ir)] = None
 
     def visit_NEW(self, ir):
-        self.calls.add((self.current_stm, ir))
+        self.calls[(self.current_stm, ir)] = None
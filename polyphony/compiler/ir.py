@@ -24,9 +24,18 @@ Loc = namedtuple('Loc', ('filename', 'lineno'))
 
 
 class IR(object):
+    __slots__ = ()
+    # names of the fields that hold an IR or a list of IRs
+    _ir_fields = ()
+    _list_fields = ()
+
     def __init__(self):
         pass
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        _generate_methods(cls)
+
     def __repr__(self):
         return self.__str__()
 
@@ -34,97 +43,128 @@ class IR(object):
         return super().__hash__()
 
     def __lt__(self, other):
-        return hash(self) < hash(other)
+        # expressions have no position, so they are ordered by their text
+        return str(self) < str(other)
 
     def is_a(self, cls):
         return is_a(self, cls)
 
-    def clone(self):
-        clone = self.__new__(self.__class__)
-        clone.__dict__ = self.__dict__.copy()
-        for k, v in clone.__dict__.items():
-            if isinstance(v, IR):
-                clone.__dict__[k] = v.clone()
-            elif isinstance(v, list):
-                li = []
-                for elm in v:
-                    if isinstance(elm, IR):
-                        li.append(elm.clone())
-                    else:
-                        li.append(elm)
-                clone.__dict__[k] = li
-        return clone
+    def field_items(self):
+        return [(f, getattr(self, f)) for f in self._fields]
 
     def replace(self, old, new):
-        def replace_rec(ir, old, new):
-            if isinstance(ir, IR):
-                if ir.is_a([CALL, SYSCALL, NEW]):
-                    return ir.replace(old, new)
-                for k, v in ir.__dict__.items():
-                    if v == old:
-                        ir.__dict__[k] = new
-                        return True
-                    elif replace_rec(v, old, new):
-                        return True
-            elif isinstance(ir, list):
-                for i, elm in enumerate(ir):
-                    if elm == old:
-                        ir[i] = new
-                        return True
-                    elif replace_rec(elm, old, new):
-                        return True
-            return False
-        return replace_rec(self, old, new)
+        return self._replace(old, new)
 
     def find_vars(self, qsym):
         vars = []
-
-        def find_vars_rec(ir, qsym, vars):
-            if isinstance(ir, IR):
-                if ir.is_a([CALL, SYSCALL, NEW]):
-                    vars.extend(ir.find_vars(qsym))
-                elif ir.is_a(TEMP):
-                    if ir.qualified_symbol() == qsym:
-                        vars.append(ir)
-                elif ir.is_a(ATTR):
-                    if ir.qualified_symbol() == qsym:
-                        vars.append(ir)
-                    else:
-                        find_vars_rec(ir.exp, qsym, vars)
-                else:
-                    for k, v in ir.__dict__.items():
-                        find_vars_rec(v, qsym, vars)
-            elif isinstance(ir, list) or isinstance(ir, tuple):
-                for elm in ir:
-                    find_vars_rec(elm, qsym, vars)
-        find_vars_rec(self, qsym, vars)
+        self._find_vars(qsym, vars)
         return vars
 
     def find_irs(self, typ):
         irs = []
-
-        def find_irs_rec(ir, typ, irs):
-            if isinstance(ir, IR):
-                if ir.is_a(typ):
-                    irs.append(ir)
-                if ir.is_a([CALL, SYSCALL, NEW]):
-                    irs.extend(ir.find_irs(typ))
-                    return
-                for k, v in ir.__dict__.items():
-                    find_irs_rec(v, typ, irs)
-            elif isinstance(ir, list) or isinstance(ir, tuple):
-                for elm in ir:
-                    find_irs_rec(elm, typ, irs)
-        find_irs_rec(self, typ, irs)
+        self._find_irs(typ, irs)
         return irs
 
 
+def _generate_methods(cls):
+    '''
+    Generates clone(), _replace(), _find_irs() and _find_vars() which know
+    the fields of the class, unless the class defines its own version.
+    '''
+    fields = []
+    ir_fields = set()
+    list_fields = set()
+    for c in reversed(cls.__mro__):
+        fields.extend(c.__dict__.get('__slots__', ()))
+        ir_fields.update(c.__dict__.get('_ir_fields', ()))
+        list_fields.update(c.__dict__.get('_list_fields', ()))
+    cls._fields = tuple(fields)
+    own = cls.__dict__
+    src = []
+    if 'clone' not in own:
+        src.append('def clone(self):')
+        src.append('    c = object.__new__(cls)')
+        for f in fields:
+            if f in ir_fields:
+                src.append('    v = self.{0}'.format(f))
+                src.append('    c.{0} = v.clone() if isinstance(v, IR) else v'.format(f))
+            elif f in list_fields:
+                src.append('    c.{0} = [v.clone() if isinstance(v, IR) else v for v in self.{0}]'.format(f))
+            else:
+                src.append('    c.{0} = self.{0}'.format(f))
+        src.append('    return c')
+    if 'replace' not in own:
+        # the first field equal to old is replaced
+        src.append('def _replace(self, old, new):')
+        for f in fields:
+            if f in ir_fields:
+                src.append('    v = self.{0}'.format(f))
+                src.append('    if v == old:')
+                src.append('        self.{0} = new'.format(f))
+                src.append('        return True')
+                src.append('    if isinstance(v, IR) and v.replace(old, new):')
+                src.append('        return True')
+            elif f in list_fields:
+                src.append('    li = self.{0}'.format(f))
+                src.append('    for i, v in enumerate(li):')
+                src.append('        if v == old:')
+                src.append('            li[i] = new')
+                src.append('            return True')
+                src.append('        if isinstance(v, IR) and v.replace(old, new):')
+                src.append('            return True')
+            else:
+                src.append('    if self.{0} == old:'.format(f))
+                src.append('        self.{0} = new'.format(f))
+                src.append('        return True')
+        src.append('    return False')
+    src.append('def _find_irs(self, typ, irs):')
+    src.append('    if self.is_a(typ):')
+    src.append('        irs.append(self)')
+    if 'find_irs' in own:
+        src.append('    irs.extend(self.find_irs(typ))')
+    else:
+        for f in fields:
+            if f in ir_fields:
+                src.append('    v = self.{0}'.format(f))
+                src.append('    if isinstance(v, IR):')
+                src.append('        v._find_irs(typ, irs)')
+            elif f in list_fields:
+                src.append('    for v in self.{0}:'.format(f))
+                src.append('        if isinstance(v, IR):')
+                src.append('            v._find_irs(typ, irs)')
+    if 'find_vars' in own:
+        src.append('def _find_vars(self, qsym, vars):')
+        src.append('    vars.extend(self.find_vars(qsym))')
+    elif '_find_vars' not in own:
+        src.append('def _find_vars(self, qsym, vars):')
+        src.append('    pass')
+        for f in fields:
+            if f in ir_fields:
+                src.append('    v = self.{0}'.format(f))
+                src.append('    if isinstance(v, IR):')
+                src.append('        v._find_vars(qsym, vars)')
+            elif f in list_fields:
+                src.append('    for v in self.{0}:'.format(f))
+                src.append('        if isinstance(v, IR):')
+                src.append('            v._find_vars(qsym, vars)')
+    namespace = {'cls': cls, 'IR': IR}
+    exec('\n'.join(src), namespace)
+    for name in ('clone', '_replace', '_find_irs', '_find_vars'):
+        if name in namespace:
+            setattr(cls, name, namespace[name])
+
+
 class IRExp(IR):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__()
 
 
 class UNOP(IRExp):
+    __slots__ = ('op', 'exp')
+    _ir_fields = ('exp',)
+
     def __init__(self, op, exp):
         super().__init__()
         self.op = op
@@ -147,6 +187,9 @@ class UNOP(IRExp):
 
 
 class BINOP(IRExp):
+    __slots__ = ('op', 'left', 'right')
+    _ir_fields = ('left', 'right')
+
     def __init__(self, op, left, right):
         super().__init__()
         self.op = op
@@ -174,6 +217,9 @@ class BINOP(IRExp):
 
 
 class RELOP(IRExp):
+    __slots__ = ('op', 'left', 'right')
+    _ir_fields = ('left', 'right')
+
     def __init__(self, op, left, right):
         super().__init__()
         self.op = op
@@ -201,6 +247,9 @@ class RELOP(IRExp):
 
 
 class CONDOP(IRExp):
+    __slots__ = ('cond', 'left', 'right')
+    _ir_fields = ('cond', 'left', 'right')
+
     def __init__(self, cond, left, right):
         super().__init__()
         self.cond = cond
@@ -223,6 +272,9 @@ class CONDOP(IRExp):
 
 
 class POLYOP(IRExp):
+    __slots__ = ('op', 'values')
+    _list_fields = ('values',)
+
     def __init__(self, op):
         self.op = op
         self.values = []
@@ -265,6 +317,8 @@ def find_irs_args(args, typ):
 
 
 class CALL(IRExp):
+    __slots__ = ('func', 'args', 'kwargs')
+
     def __init__(self, func, args, kwargs):
         super().__init__()
         self.func = func
@@ -328,6 +382,8 @@ class CALL(IRExp):
 
 
 class SYSCALL(IRExp):
+    __slots__ = ('sym', 'args', 'kwargs')
+
     def __init__(self, sym, args, kwargs):
         super().__init__()
         self.sym = sym
@@ -378,6 +434,8 @@ class SYSCALL(IRExp):
 
 
 class NEW(IRExp):
+    __slots__ = ('sym', 'args', 'kwargs')
+
     def __init__(self, sym, args, kwargs):
         super().__init__()
         self.sym = sym
@@ -427,6 +485,8 @@ class NEW(IRExp):
 
 
 class CONST(IRExp):
+    __slots__ = ('value',)
+
     def __init__(self, value):
         super().__init__()
         self.value = value
@@ -452,6 +512,9 @@ class CONST(IRExp):
 
 
 class MREF(IRExp):
+    __slots__ = ('mem', 'offset', 'ctx')
+    _ir_fields = ('mem', 'offset')
+
     def __init__(self, mem, offset, ctx):
         super().__init__()
         assert mem.is_a([TEMP, ATTR])
@@ -475,6 +538,9 @@ class MREF(IRExp):
 
 
 class MSTORE(IRExp):
+    __slots__ = ('mem', 'offset', 'exp')
+    _ir_fields = ('mem', 'offset', 'exp')
+
     def __init__(self, mem, offset, exp):
         super().__init__()
         self.mem = mem
@@ -497,6 +563,10 @@ class MSTORE(IRExp):
 
 
 class ARRAY(IRExp):
+    __slots__ = ('items', 'sym', 'repeat', 'is_mutable')
+    _ir_fields = ('repeat',)
+    _list_fields = ('items',)
+
     def __init__(self, items, is_mutable=True):
         super().__init__()
         self.items = items
@@ -542,6 +612,8 @@ class ARRAY(IRExp):
 
 
 class TEMP(IRExp):
+    __slots__ = ('sym', 'ctx')
+
     def __init__(self, sym, ctx):
         super().__init__()
         self.sym = sym
@@ -572,15 +644,23 @@ class TEMP(IRExp):
     def qualified_symbol(self):
         return (self.sym, )
 
+    def _find_vars(self, qsym, vars):
+        if self.qualified_symbol() == qsym:
+            vars.append(self)
+
 
 class ATTR(IRExp):
+    __slots__ = ('exp', 'attr', 'ctx', 'attr_scope')
+    _ir_fields = ('exp',)
+
     def __init__(self, exp, attr, ctx, attr_scope=None):
         super().__init__()
         self.exp = exp
         self.attr = attr
         self.ctx = ctx
         self.attr_scope = attr_scope
-        self.exp.ctx = Ctx.LOAD
+        if self.exp.is_a([TEMP, ATTR, MREF]):
+            self.exp.ctx = Ctx.LOAD
 
     def __str__(self):
         return '{}.{}'.format(self.exp, self.attr)
@@ -625,8 +705,16 @@ class ATTR(IRExp):
     def qualified_symbol(self):
         return self.exp.qualified_symbol() + (self.attr,)
 
+    def _find_vars(self, qsym, vars):
+        if self.qualified_symbol() == qsym:
+            vars.append(self)
+        else:
+            self.exp._find_vars(qsym, vars)
+
 
 class IRStm(IR):
+    __slots__ = ('loc', 'block')
+
     def __init__(self, loc):
         super().__init__()
         if not loc:
@@ -635,8 +723,27 @@ class IRStm(IR):
             self.loc = loc
         self.block = None
 
+    def __lt__(self, other):
+        return self.sort_key() < other.sort_key()
+
+    def sort_key(self):
+        '''Returns (scope id, block number, index in the block)'''
+        blk = self.block
+        if blk is None:
+            return (-1, -1, -1)
+        return (blk.scope.scope_id, blk.num, blk.stm_index(self))
+
     def program_order(self):
-        return (self.block.order, self.block.stms.index(self))
+        return (self.block.order, self.block.stm_index(self))
+
+    def replace(self, old, new):
+        usedef = self.block.scope.usedef if self.block else None
+        if usedef and usedef.has_stm(self):
+            usedef.remove_stm(self)
+            ret = super().replace(old, new)
+            usedef.add_stm(self)
+            return ret
+        return super().replace(old, new)
 
     def kids(self):
         return []
@@ -649,6 +756,9 @@ class IRStm(IR):
 
 
 class EXPR(IRStm):
+    __slots__ = ('exp',)
+    _ir_fields = ('exp',)
+
     def __init__(self, exp, loc=None):
         super().__init__(loc)
         self.exp = exp
@@ -669,6 +779,9 @@ class EXPR(IRStm):
 
 
 class CJUMP(IRStm):
+    __slots__ = ('exp', 'true', 'false', 'loop_branch')
+    _ir_fields = ('exp',)
+
     def __init__(self, exp, true, false, loc=None):
         super().__init__(loc)
         self.exp = exp
@@ -689,6 +802,9 @@ class CJUMP(IRStm):
 
 
 class MCJUMP(IRStm):
+    __slots__ = ('conds', 'targets', 'loop_branch')
+    _list_fields = ('conds', 'targets')
+
     def __init__(self, loc=None):
         super().__init__(loc)
         self.conds = []
@@ -715,6 +831,8 @@ class MCJUMP(IRStm):
 
 
 class JUMP(IRStm):
+    __slots__ = ('target', 'typ')
+
     def __init__(self, target, typ='', loc=None):
         super().__init__(loc)
         self.target = target
@@ -733,6 +851,9 @@ class JUMP(IRStm):
 
 
 class RET(IRStm):
+    __slots__ = ('exp',)
+    _ir_fields = ('exp',)
+
     def __init__(self, exp, loc=None):
         super().__init__(loc)
         self.exp = exp
@@ -753,6 +874,9 @@ class RET(IRStm):
 
 
 class MOVE(IRStm):
+    __slots__ = ('dst', 'src')
+    _ir_fields = ('dst', 'src')
+
     def __init__(self, dst, src, loc=None):
         super().__init__(loc)
         self.dst = dst
@@ -774,6 +898,9 @@ class MOVE(IRStm):
 
 
 class CEXPR(EXPR):
+    __slots__ = ('cond',)
+    _ir_fields = ('cond',)
+
     def __init__(self, cond, exp, loc=None):
         super().__init__(exp, loc)
         assert isinstance(cond, IRExp)
@@ -795,6 +922,9 @@ class CEXPR(EXPR):
 
 
 class CMOVE(MOVE):
+    __slots__ = ('cond',)
+    _ir_fields = ('cond',)
+
     def __init__(self, cond, dst, src, loc=None):
         super().__init__(dst, src, loc)
         assert isinstance(cond, IRExp)
@@ -826,6 +956,10 @@ def conds2str(conds):
 
 
 class PHIBase(IRStm):
+    __slots__ = ('var', 'args', 'ps')
+    _ir_fields = ('var',)
+    _list_fields = ('args', 'ps')
+
     def __init__(self, var):
         super().__init__(loc=None)
         assert var.is_a([TEMP, ATTR])
@@ -884,6 +1018,8 @@ class PHIBase(IRStm):
 
 
 class PHI(PHIBase):
+    __slots__ = ()
+
     def __init__(self, var):
         super().__init__(var)
 
@@ -900,6 +1036,8 @@ class PHI(PHIBase):
 
 
 class UPHI(PHIBase):
+    __slots__ = ()
+
     def __init__(self, var):
         super().__init__(var)
 
@@ -909,6 +1047,8 @@ class UPHI(PHIBase):
 
 
 class LPHI(PHIBase):
+    __slots__ = ()
+
     def __init__(self, var):
         super().__init__(var)
 
@@ -61,7 +61,6 @@ class ImportVisitor(ast.NodeVisitor):
             return spec.name, abspath
 
     def _load_file(self, name, path):
-        from .common import read_source
         logger.debug(f'load file {path}')
         assert name not in env.scopes
         cur_filename = env.current_filename
@@ -71,6 +70,14 @@ class ImportVisitor(ast.NodeVisitor):
             tags.add('lib')
         if os.path.basename(path) == '__init__.py':
             tags.add('package')
+        if env.lib_cache and 'lib' in tags:
+            env.lib_cache.translate(name, lambda: self._translate_file(name, path, tags))
+        else:
+            self._translate_file(name, path, tags)
+        env.set_current_filename(cur_filename)
+
+    def _translate_file(self, name, path, tags):
+        from .common import read_source
         namespace = Scope.create_namespace(None, name, tags, path)
         env.push_outermost_scope(namespace)
         for sym in builtin_symbols.values():
@@ -78,7 +85,6 @@ class ImportVisitor(ast.NodeVisitor):
         translator = IRTranslator()
         translator.translate(read_source(path), '', top=namespace)
         env.pop_outermost_scope()
-        env.set_current_filename(cur_filename)
 
     def _load_module(self, name):
         if name in env.scopes:
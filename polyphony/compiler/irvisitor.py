@@ -2,6 +2,13 @@ from .ir import IRStm, JUMP, CJUMP, MCJUMP
 
 
 class IRVisitor(object):
+    # IR class -> (visitor function or None, whether the IR is a statement)
+    _visitors = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._visitors = {}
+
     def __init__(self):
         pass
 
@@ -23,15 +30,24 @@ class IRVisitor(object):
             self.visit(block.path_exp)
 
     def visit(self, ir):
-        method = 'visit_' + ir.__class__.__name__
-        visitor = getattr(self, method, None)
-        if ir.is_a(IRStm):
+        try:
+            visitor, is_stm = self._visitors[ir.__class__]
+        except KeyError:
+            visitor, is_stm = self._find_visitor(ir.__class__)
+        if is_stm:
             self.current_stm = ir
         if visitor:
-            return visitor(ir)
+            return visitor(self, ir)
         else:
             return None
 
+    @classmethod
+    def _find_visitor(cls, ir_cls):
+        method = 'visit_' + ir_cls.__name__
+        entry = (getattr(cls, method, None), issubclass(ir_cls, IRStm))
+        cls._visitors[ir_cls] = entry
+        return entry
+
     def visit_UNOP(self, ir):
         self.visit(ir.exp)
 
@@ -136,6 +152,7 @@ class IRTransformer(IRVisitor):
         pass
 
     def _process_block(self, block):
+        old_stms = block.stms
         self.new_stms = []
         for stm in block.stms:
             self.visit(stm)
@@ -150,6 +167,18 @@ class IRTransformer(IRVisitor):
             block.stms.extend(self.new_stms)
         for stm in block.stms:
             stm.block = block
+        usedef = block.scope.usedef
+        if usedef:
+            # most statements are visited without any change,
+            # so only the ones that have been removed, added or rewritten are updated
+            old_stms = set(old_stms)
+            for stm in old_stms.difference(block.stms):
+                usedef.remove_stm(stm)
+            for stm in block.stms:
+                if stm in old_stms:
+                    usedef.update_stm(stm)
+                else:
+                    usedef.add_stm(stm)
 
     def visit_UNOP(self, ir):
         ir.exp = self.visit(ir.exp)
@@ -5,6 +5,17 @@ from .env import env
 UNIT_STEP = 1
 CALL_MINIMUM_STEP = 5
 
+# The combinational delays (ns) of the operators
+OP_DELAYS = {
+    'Add': 2.0, 'Sub': 2.0, 'Mult': 6.0, 'FloorDiv': 40.0, 'Mod': 40.0,
+    'LShift': 2.0, 'RShift': 2.0,
+    'BitOr': 0.5, 'BitXor': 0.5, 'BitAnd': 0.5,
+    'And': 0.5, 'Or': 0.5,
+    'Eq': 1.5, 'NotEq': 1.5, 'IsNot': 1.5, 'Lt': 2.0, 'LtE': 2.0, 'Gt': 2.0, 'GtE': 2.0,
+    'USub': 2.0, 'UAdd': 0.0, 'Not': 0.5, 'Invert': 0.5,
+}
+MUX_DELAY = 1.0
+
 
 def get_call_latency(call, stm):
     # FIXME: It is better to ask HDLInterface the I/O latency
@@ -128,3 +139,50 @@ def get_latency(tag):
         return l[0], l[1]
     else:
         return l, l
+
+
+def _is_power_of_2(v):
+    return isinstance(v, int) and v > 0 and v & (v - 1) == 0
+
+
+def _get_exp_delay(ir):
+    if ir.is_a(BINOP):
+        if ir.op in ('LShift', 'RShift') and ir.right.is_a(CONST):
+            # just wiring
+            return _get_exp_delay(ir.left)
+        if ir.op in ('Mult', 'FloorDiv') and ir.right.is_a(CONST) and _is_power_of_2(ir.right.value):
+            return _get_exp_delay(ir.left)
+        if ir.op == 'Mult' and ir.left.is_a(CONST) and _is_power_of_2(ir.left.value):
+            return _get_exp_delay(ir.right)
+        return OP_DELAYS[ir.op] + max(_get_exp_delay(ir.left), _get_exp_delay(ir.right))
+    elif ir.is_a(RELOP):
+        return OP_DELAYS[ir.op] + max(_get_exp_delay(ir.left), _get_exp_delay(ir.right))
+    elif ir.is_a(UNOP):
+        return OP_DELAYS[ir.op] + _get_exp_delay(ir.exp)
+    elif ir.is_a(CONDOP):
+        return MUX_DELAY + max(_get_exp_delay(ir.cond),
+                               _get_exp_delay(ir.left),
+                               _get_exp_delay(ir.right))
+    elif ir.is_a(MREF):
+        memnode = ir.mem.symbol().typ.get_memnode()
+        if memnode.can_be_reg() or not memnode.is_writable():
+            return MUX_DELAY + _get_exp_delay(ir.offset)
+        return _get_exp_delay(ir.offset)
+    return 0.0
+
+
+def get_delay(tag):
+    '''Returns the combinational delay (ns) of the statement'''
+    assert isinstance(tag, IRStm)
+    if tag.is_a(CMOVE):
+        return max(_get_exp_delay(tag.cond), _get_exp_delay(tag.src))
+    elif tag.is_a(MOVE):
+        return _get_exp_delay(tag.src)
+    elif tag.is_a(CEXPR):
+        return max(_get_exp_delay(tag.cond), _get_exp_delay(tag.exp))
+    elif tag.is_a(EXPR):
+        return _get_exp_delay(tag.exp)
+    elif tag.is_a(PHIBase):
+        delays = [_get_exp_delay(p) for p in tag.ps if p]
+        return MUX_DELAY + max(delays, default=0.0) if len(tag.args) > 1 else 0.0
+    return 0.0
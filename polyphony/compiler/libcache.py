@@ -0,0 +1,190 @@
+import hashlib
+import os
+import pickle
+from .builtin import builtin_symbols
+from .common import src_texts
+from .env import env
+from .scope import Scope
+from .symbol import Symbol
+from .type import Type
+from ..version import __version__
+
+
+TYPE_CONSTANTS = ('bool_t', 'str_t', 'none_t', 'undef_t', 'ellipsis_t', 'generic_t', 'any_t')
+
+
+class _SnapshotPickler(pickle.Pickler):
+    '''Pickles the objects created by a translation and refers to the others by name'''
+    def __init__(self, f, new_scopes, new_symbols):
+        super().__init__(f, pickle.HIGHEST_PROTOCOL)
+        self.new_scopes = new_scopes
+        self.new_symbols = new_symbols
+        self.builtins = {id(sym): name for name, sym in builtin_symbols.items()}
+        self.types = {id(getattr(Type, name)): name for name in TYPE_CONSTANTS}
+
+    def persistent_id(self, obj):
+        if isinstance(obj, Scope):
+            if obj in self.new_scopes:
+                return None
+            return ('scope', obj.name)
+        elif isinstance(obj, Symbol):
+            if obj in self.new_symbols:
+                return None
+            if id(obj) in self.builtins:
+                return ('builtin', self.builtins[id(obj)])
+            if obj.scope.symbols.get(obj.name) is obj:
+                return ('symbol', obj.scope.name, obj.name)
+            raise pickle.PicklingError('unknown symbol {}'.format(obj))
+        elif isinstance(obj, Type):
+            if id(obj) in self.types:
+                return ('type', self.types[id(obj)])
+        return None
+
+
+class _SnapshotUnpickler(pickle.Unpickler):
+    def persistent_load(self, pid):
+        kind = pid[0]
+        if kind == 'scope':
+            return env.scopes[pid[1]]
+        elif kind == 'builtin':
+            return builtin_symbols[pid[1]]
+        elif kind == 'symbol':
+            return env.scopes[pid[1]].symbols[pid[2]]
+        elif kind == 'type':
+            return getattr(Type, pid[1])
+        raise pickle.UnpicklingError('unknown persistent id {}'.format(pid))
+
+
+class _Snapshot(object):
+    '''Records the changes made on env by a translation of a library'''
+    def __init__(self):
+        self.scope_names = set(env.scopes.keys())
+        self.symbol_count = len(env.all_symbols)
+        self.scope_id = env.scope_id
+        self.builtin_names = set(builtin_symbols.keys())
+        self.src_files = set(src_texts.keys())
+        self.scope_symbols = {s: set(s.symbols.keys()) for s in env.scopes.values()}
+        self.scope_children = {s: len(s.children) for s in env.scopes.values()}
+
+    def dump(self, f):
+        new_scopes = [s for name, s in env.scopes.items() if name not in self.scope_names]
+        new_symbols = env.all_symbols[self.symbol_count:]
+        added_syms = []
+        added_children = []
+        for s, names in self.scope_symbols.items():
+            for name, sym in s.symbols.items():
+                if name not in names:
+                    added_syms.append((s.name, name, sym))
+            for child in s.children[self.scope_children[s]:]:
+                added_children.append((s.name, child))
+        payload = {
+            'scopes': new_scopes,
+            'files': [env.scope_file_map[s] for s in new_scopes],
+            'symbols': new_symbols,
+            'scope_id': self.scope_id,
+            'scope_count': env.scope_id - self.scope_id,
+            'added_syms': added_syms,
+            'added_children': added_children,
+            'builtins': [(name, sym) for name, sym in builtin_symbols.items()
+                         if name not in self.builtin_names],
+            'src_texts': [(name, lines) for name, lines in src_texts.items()
+                          if name not in self.src_files],
+        }
+        _SnapshotPickler(f, set(new_scopes), set(new_symbols)).dump(payload)
+
+    @classmethod
+    def load(cls, f):
+        payload = _SnapshotUnpickler(f).load()
+        for s, filename in zip(payload['scopes'], payload['files']):
+            s.scope_id += env.scope_id - payload['scope_id']
+            env.scopes[s.name] = s
+            env.all_scopes[s.name] = s
+            env.scope_file_map[s] = filename
+        env.scope_id += payload['scope_count']
+        for sym in payload['symbols']:
+            sym.id = len(env.all_symbols)
+            env.all_symbols.append(sym)
+        for scope_name, name, sym in payload['added_syms']:
+            env.scopes[scope_name].symbols[name] = sym
+        for scope_name, child in payload['added_children']:
+            env.scopes[scope_name].children.append(child)
+        env.scopes_version += 1
+        for name, sym in payload['builtins']:
+            builtin_symbols[name] = sym
+        for name, lines in payload['src_texts']:
+            src_texts[name] = lines
+
+
+class LibraryCache(object):
+    '''
+    On-disk snapshots of the translated library scopes.
+
+    A snapshot holds the Scope/Symbol/Type objects made by translating a library
+    (the builtins or a package in polyphony/_internal). It is keyed on the hashes
+    of the library files, the config and the state of env that the translation
+    depends on (the loaded namespaces with their symbols and the number of symbols,
+    which the names of temporaries are made from), so loading a snapshot gives exactly the same
+    result as translating the library.
+    '''
+    def __init__(self, cache, salt):
+        self.cache = cache
+        self.salt = salt
+        self._lib_hash = None
+
+    def _library_hash(self):
+        if self._lib_hash is None:
+            h = hashlib.sha256()
+            internal_dir = os.path.join(env.root_dir, '_internal')
+            for name in sorted(os.listdir(internal_dir)):
+                if not name.endswith('.py'):
+                    continue
+                h.update(name.encode('utf-8'))
+                with open(os.path.join(internal_dir, name), 'rb') as f:
+                    h.update(f.read())
+            self._lib_hash = h.hexdigest()
+        return self._lib_hash
+
+    def key(self, name):
+        namespaces = sorted([(s.name, sorted(s.symbols.keys()))
+                             for s in env.scopes.values() if s.is_namespace()])
+        items = [
+            __version__,
+            self.salt,
+            self._library_hash(),
+            name,
+            repr(namespaces),
+            repr(sorted(builtin_symbols.keys())),
+            str(len(env.all_symbols)),
+        ]
+        h = hashlib.sha256()
+        for item in items:
+            h.update(item.encode('utf-8'))
+            h.update(b'\0')
+        return h.hexdigest()
+
+    def translate(self, name, translate_fn):
+        '''Load the snapshot of the library, or call translate_fn and store its snapshot'''
+        key = self.key(name)
+        path = self.cache.entry_path('l' + key, '.pickle')
+        if os.path.exists(path):
+            try:
+                with open(path, 'rb') as f:
+                    _Snapshot.load(f)
+                os.utime(path)
+                return
+            except (OSError, EOFError, pickle.UnpicklingError, KeyError, AttributeError, TypeError):
+                # env is not changed until the whole snapshot has been unpickled
+                # (a snapshot of older IR classes fails with AttributeError or TypeError)
+                pass
+        snapshot = _Snapshot()
+        translate_fn()
+        tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+        try:
+            with open(tmp_path, 'wb') as f:
+                snapshot.dump(f)
+            os.replace(tmp_path, path)
+        except (OSError, pickle.PicklingError, TypeError, AttributeError, RecursionError):
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        self.cache.evict()
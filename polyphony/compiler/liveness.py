@@ -2,35 +2,110 @@ from collections import defaultdict
 from logging import getLogger
 logger = getLogger(__name__)
 
+
 class Liveness:
+    '''
+    Liveness of the symbols defined in a scope.
+
+    Every symbol gets a bit of an integer, and the sets of the blocks are solved
+    as bit vectors by the backward (live) and forward (defined) dataflow.
+    A symbol is live at a block if the block is on a path from a definition of
+    the symbol to a use of it. (sym, True) is recorded if the path goes
+    through a loop back edge and (sym, False) if it does not.
+    '''
     def __init__(self):
         self.liveins = defaultdict(set)
         self.liveouts = defaultdict(set)
 
     def process(self, scope):
         usedef = scope.usedef
-        syms = usedef.get_all_def_syms()
-        for sym in syms:
-            logger.log(0, sym.name + ' paths')
-            defblks = usedef.get_blks_defining(sym)
-            useblks = usedef.get_blks_using(sym)
-            for defblk in defblks:
-                for useblk in useblks:
-                    results = []
-                    self._trace_path(defblk, defblk, useblk, [], results, False)
-                    for blks, hasloop in results:
-                        logger.log(0, 'path -- ' + ', '.join([b.name for b in blks]))
-                        logger.log(0, 'hasloop ' + str(hasloop))
-                        self.liveouts[blks[0]].add((sym, hasloop))
-                        if len(blks) > 1:
-                            for b in blks[1:-1]:
-                                self.liveins[b].add((sym, hasloop))
-                                self.liveouts[b].add((sym, hasloop))
-                            self.liveins[blks[-1]].add((sym, hasloop))
+        self.syms = list(usedef.get_all_def_syms())
+        self.bits = {sym: 1 << i for i, sym in enumerate(self.syms)}
+        blocks = list(scope.traverse_blocks())
+        uses = {}
+        defs = {}
+        for blk in blocks:
+            uses[blk], defs[blk] = self._local_sets(blk, usedef)
+
+        live_in, live_out = self._solve(blocks,
+                                        lambda b: b.succs, lambda b: b.succs_loop,
+                                        uses, defs)
+        def_out, def_in = self._solve(list(reversed(blocks)),
+                                      lambda b: b.preds, lambda b: b.preds_loop,
+                                      defs, defs)
+        for blk in blocks:
+            self._add(self.liveins[blk], live_in[blk], def_in[blk])
+            self._add(self.liveouts[blk], live_out[blk], def_out[blk])
         scope.liveins = self.liveins
         scope.liveouts = self.liveouts
         #self.dump()
 
+    def _mask(self, syms):
+        mask = 0
+        for sym in syms:
+            mask |= self.bits.get(sym, 0)
+        return mask
+
+    def _local_sets(self, blk, usedef):
+        '''Returns the upward exposed uses and the definitions in the block'''
+        uses = 0
+        defs = 0
+        for stm in reversed(blk.stms):
+            d = self._mask(usedef.get_syms_defined_at(stm))
+            u = self._mask(usedef.get_syms_used_at(stm))
+            uses = (uses & ~d) | u
+            defs |= d
+        return uses, defs
+
+    def _solve(self, blocks, nexts, loop_nexts, gen, kill):
+        '''
+        Solves the sets at the both ends of the blocks along the edges of nexts.
+        Each set is a tuple of the bits through any path, through the paths without
+        loop back edges and through the paths with loop back edges.
+        The blocks should be in the reverse order of the edges for fast convergence.
+        '''
+        heads = {blk: (0, 0, 0) for blk in blocks}
+        tails = dict(heads)
+        changed = True
+        while changed:
+            changed = False
+            for blk in reversed(blocks):
+                any_bits = non_loop_bits = loop_bits = 0
+                loops = loop_nexts(blk)
+                for n in nexts(blk):
+                    if n not in heads:
+                        continue
+                    n_any, n_non_loop, n_loop = heads[n]
+                    any_bits |= n_any
+                    if n in loops:
+                        loop_bits |= n_any
+                    else:
+                        non_loop_bits |= n_non_loop
+                        loop_bits |= n_loop
+                tail = (any_bits, non_loop_bits, loop_bits)
+                k = ~kill[blk]
+                head = (gen[blk] | (any_bits & k),
+                        gen[blk] | (non_loop_bits & k),
+                        loop_bits & k)
+                if head != heads[blk] or tail != tails[blk]:
+                    heads[blk] = head
+                    tails[blk] = tail
+                    changed = True
+        return heads, tails
+
+    def _add(self, result, live, defined):
+        live_any, live_non_loop, live_loop = live
+        def_any, def_non_loop, def_loop = defined
+        for sym in self._syms(live_non_loop & def_non_loop):
+            result.add((sym, False))
+        for sym in self._syms((live_loop & def_any) | (live_any & def_loop)):
+            result.add((sym, True))
+
+    def _syms(self, mask):
+        while mask:
+            bit = mask & -mask
+            yield self.syms[bit.bit_length() - 1]
+            mask ^= bit
 
     def dump(self):
         logger.debug("::::: Live in :::::")
@@ -41,18 +116,3 @@ class Liveness:
         for blk, syms in sorted(self.liveouts.items()):
             logger.debug(blk.name)
             logger.debug('   ' + ', '.join([s.name+':'+str(hasloop) for s, hasloop in syms]))
-
-    def _trace_path(self, start, frm, to, path, results, hasloop):
-        if frm in path:
-            return
-        path.append(frm)
-        if frm is to:
-            results.append((list(path), hasloop))
-            return True
-        for succ in frm.succs:
-            if start is succ:
-                continue
-            hasloop |= succ in frm.succs_loop
-            self._trace_path(start, succ, to, path, results, hasloop)
-        path.pop()
-        return False
@@ -1,10 +1,10 @@
-﻿from collections import deque, defaultdict
+﻿from collections import defaultdict
 from .ir import *
 from .type import Type
 from .irvisitor import IRVisitor
 from .env import env
 from .scope import Scope
-from .utils import replace_item
+from .utils import replace_item, Worklist
 from logging import getLogger
 logger = getLogger(__name__)
 
@@ -715,7 +715,7 @@ class MemRefGraphBuilder(IRVisitor):
 
     def process_all(self, driver):
         scopes = Scope.get_scopes(bottom_up=False, with_global=True, with_class=True)
-        worklist = deque()
+        worklist = Worklist()
         #usedefs = [s.usedef for s in scopes]
         for s in scopes:
             if s.is_ctor():
@@ -737,13 +737,12 @@ class MemRefGraphBuilder(IRVisitor):
                     memsym = stm.var.sym
 
                 uses = usedef.get_stms_using(memsym)
-                uses = uses.difference(set(worklist))
-                worklist.extend(list(uses))
+                worklist.extend(sorted(uses))
             # collect the access to a global list variable
             for sym in usedef.get_all_use_syms():
                 if (sym.scope.is_namespace() or sym.scope.is_class()) and sym.typ.is_seq():
                     uses = usedef.get_stms_using(sym)
-                    worklist.extend(list(uses))
+                    worklist.extend(sorted(uses))
 
         while worklist:
             stm = worklist.popleft()
@@ -838,7 +837,7 @@ class MemRefGraphBuilder(IRVisitor):
             for i in reversed(removed_indices):
                 self.edges.pop(i)
             if new_edges and (set(new_edges) - set(prev_new_edges)):
-                self.edges = list(set(self.edges) | set(new_edges))
+                self.edges = list(dict.fromkeys(self.edges + new_edges))
                 prev_new_edges = new_edges.copy()
             else:
                 break
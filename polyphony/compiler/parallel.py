@@ -0,0 +1,115 @@
+import io
+import multiprocessing
+import sys
+from .driver import Driver
+from .env import env
+
+
+_current = None
+
+
+def _run_shard(index):
+    return _current.run_shard(index)
+
+
+class ParallelPasses(object):
+    '''
+    Runs the per-scope procs on independent groups of scopes in worker processes.
+
+    Scopes are grouped by the connected components of env.depend_graph and
+    env.call_graph, so the scopes of a group never touch the scopes of another group.
+    Each group is processed by a sub Driver in a forked process and only the
+    generated codes are sent back to the parent process.
+    Namespaces, library scopes and classes other than instantiated modules are
+    shared read-only and they are not handed to the sub Drivers.
+    '''
+    def __init__(self, procs, jobs):
+        self.procs = procs
+        self.jobs = jobs
+        self.__name__ = 'parallel'
+
+    def _is_shared(self, scope):
+        if scope.is_namespace() or scope.is_lib():
+            return True
+        return scope.is_class() and not (scope.is_module() and scope.is_instantiated())
+
+    def _find(self, parents, s):
+        while parents[s] is not s:
+            parents[s] = parents[parents[s]]
+            s = parents[s]
+        return s
+
+    def _make_shards(self, driver):
+        scopes = [s for s in driver.all_scopes() if not self._is_shared(s)]
+        parents = {s: s for s in scopes}
+        for g in (env.depend_graph, env.call_graph):
+            if not g:
+                continue
+            for s in scopes:
+                if not g.has_node(s):
+                    continue
+                for succ in g.succs(s):
+                    if succ not in parents:
+                        continue
+                    r1 = self._find(parents, s)
+                    r2 = self._find(parents, succ)
+                    if r1 is not r2:
+                        parents[r2] = r1
+        groups = {}
+        for s in scopes:
+            groups.setdefault(self._find(parents, s), []).append(s)
+        shards = []
+        for group in groups.values():
+            enables = [s for s in driver.scopes if s in group]
+            disables = [s for s in driver.disable_scopes if s in group]
+            shards.append((enables, disables))
+        # start the largest groups first
+        shards.sort(key=lambda shard: -(len(shard[0]) + len(shard[1])))
+        return shards
+
+    def _sub_driver(self, enables, disables):
+        sub = Driver(self.procs, enables)
+        sub.disable_scopes = disables[:]
+        return sub
+
+    def run_shard(self, index):
+        enables, disables = self.shards[index]
+        stdout = sys.stdout
+        sys.stdout = io.StringIO()
+        error = None
+        try:
+            sub = self._sub_driver(enables, disables)
+            sub.run()
+            codes = {s.name: code for s, code in sub.codes.items()}
+        except Exception as e:
+            codes = {}
+            error = e
+        finally:
+            output = sys.stdout.getvalue()
+            sys.stdout = stdout
+        return codes, list(env.using_libs), output, error
+
+    def __call__(self, driver):
+        global _current
+        self.shards = self._make_shards(driver)
+        if len(self.shards) <= 1 or 'fork' not in multiprocessing.get_all_start_methods():
+            sub = self._sub_driver(driver.scopes, driver.disable_scopes)
+            sub.run()
+            driver.codes.update(sub.codes)
+            return
+        _current = self
+        try:
+            ctx = multiprocessing.get_context('fork')
+            jobs = min(self.jobs, len(self.shards))
+            with ctx.Pool(jobs, maxtasksperchild=1) as pool:
+                results = pool.map(_run_shard, range(len(self.shards)), chunksize=1)
+        finally:
+            _current = None
+        for codes, using_libs, output, error in results:
+            sys.stdout.write(output)
+            if error:
+                raise error
+            for name, code in codes.items():
+                driver.set_result(env.scopes[name], code)
+            for lib in using_libs:
+                env.add_using_lib(lib)
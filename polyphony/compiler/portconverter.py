@@ -121,7 +121,7 @@ class PortConverter(IRTransformer):
                     if not env.depend_graph.preds(m):
                         continue
                     assert ctor.usedef
-                    stm = ctor.usedef.get_stms_defining(field).pop()
+                    stm = list(ctor.usedef.get_stms_defining(field))[0]
                     warn(stm, Warnings.PORT_IS_NOT_USED,
                          [field.orig_name()])
             # check for local variable port
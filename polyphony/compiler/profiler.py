@@ -0,0 +1,86 @@
+import csv
+import json
+import time
+import tracemalloc
+from collections import OrderedDict
+
+
+class PassProfiler(object):
+    '''Collects the cost of each (proc, scope) step executed by the Driver'''
+    FIELDS = ('stage', 'proc', 'scope', 'wall_time', 'cpu_time', 'peak_mem', 'scope_count')
+
+    def __init__(self):
+        self.records = []
+        self._own_tracing = False
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._own_tracing = True
+
+    def stop(self):
+        if self._own_tracing:
+            tracemalloc.stop()
+            self._own_tracing = False
+
+    def begin(self):
+        if hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+        mem, _ = tracemalloc.get_traced_memory()
+        return time.perf_counter(), time.process_time(), mem
+
+    def end(self, start, stage, proc, scope, scope_count):
+        wall, cpu, mem = start
+        _, peak = tracemalloc.get_traced_memory()
+        record = OrderedDict()
+        record['stage'] = stage
+        record['proc'] = proc.__name__
+        record['scope'] = scope.name if scope else ''
+        record['wall_time'] = time.perf_counter() - wall
+        record['cpu_time'] = time.process_time() - cpu
+        record['peak_mem'] = max(peak - mem, 0)
+        record['scope_count'] = scope_count
+        self.records.append(record)
+
+    def summary(self):
+        '''Accumulate the records per stage, in plan order'''
+        stages = OrderedDict()
+        for r in self.records:
+            key = (r['stage'], r['proc'])
+            if key not in stages:
+                s = OrderedDict()
+                s['stage'] = r['stage']
+                s['proc'] = r['proc']
+                s['wall_time'] = 0.0
+                s['cpu_time'] = 0.0
+                s['peak_mem'] = 0
+                s['scope_count'] = 0
+                stages[key] = s
+            s = stages[key]
+            s['wall_time'] += r['wall_time']
+            s['cpu_time'] += r['cpu_time']
+            s['peak_mem'] = max(s['peak_mem'], r['peak_mem'])
+            s['scope_count'] = max(s['scope_count'], r['scope_count'])
+        return list(stages.values())
+
+    def write(self, filename):
+        if filename.endswith('.csv'):
+            self.write_csv(filename)
+        else:
+            self.write_json(filename)
+
+    def write_json(self, filename):
+        report = OrderedDict()
+        report['total_wall_time'] = sum([r['wall_time'] for r in self.records])
+        report['total_cpu_time'] = sum([r['cpu_time'] for r in self.records])
+        report['stages'] = self.summary()
+        report['records'] = self.records
+        with open(filename, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    def write_csv(self, filename):
+        with open(filename, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=self.FIELDS)
+            writer.writeheader()
+            for r in self.records:
+                writer.writerow(r)
@@ -1,7 +1,12 @@
+import re
+from collections import defaultdict
 from .ahdl import *
 from .ahdlvisitor import AHDLVisitor
 from .ir import *
 from .irvisitor import IRVisitor
+from .signal import Signal
+from logging import getLogger
+logger = getLogger(__name__)
 
 
 class AliasVarDetector(IRVisitor):
@@ -63,5 +68,330 @@ class AliasVarDetector(IRVisitor):
 
 
 class RegReducer(AHDLVisitor):
-    # TODO
-    pass
+    '''
+    Shares a register among the local variables whose lifetimes do not overlap.
+
+    The lifetimes are solved as the liveness on the state transition graph.
+    A register is read in a state if the state uses it directly or through
+    the nets driven by it, and it is written at the end of the state.
+    The registers live at the initial state are not shared because they are
+    read with their reset values.
+    Then the variables are bound to the registers of the same width and sign
+    in the order of the states in which they appear (left-edge).
+    '''
+    SHARABLE_TAGS = {'reg', 'int', 'induction'}
+    UNSUPPORTED = (AHDL_SEQ, AHDL_LOAD, AHDL_STORE, AHDL_IO_READ, AHDL_IO_WRITE,
+                   AHDL_MODULECALL, AHDL_META_MULTI_WAIT)
+
+    def process(self, hdlmodule):
+        if hdlmodule.scope.is_testbench():
+            return
+        self.hdlmodule = hdlmodule
+        self.symbols = set()
+        fsm_sigs = {}
+        for fsm in hdlmodule.fsms.values():
+            fsm_sigs[fsm] = self._collect_fsm(fsm)
+        externals = self._collect_external_sigs(hdlmodule, fsm_sigs)
+        num_of_regs = 0
+        num_of_bits = 0
+        for fsm in hdlmodule.fsms.values():
+            if fsm_sigs[fsm] is None:
+                continue
+            merged = self._reduce_fsm(fsm, externals)
+            num_of_regs += len(merged)
+            num_of_bits += sum([sig.width for sig in merged])
+        if num_of_regs:
+            logger.info('{}: {} registers ({} bits) are shared with other registers'.
+                        format(hdlmodule.name, num_of_regs, num_of_bits))
+
+    def _collect_fsm(self, fsm):
+        '''Collects the uses, the definitions and the transitions of each state'''
+        if any([stg.scheduling == 'pipeline' for stg in fsm.stgs]):
+            return None
+        self.states = [state for stg in fsm.stgs for state in stg.states]
+        self.state_uses = {}
+        self.state_defs = {}
+        self.state_edges = {}
+        self.net_uses = defaultdict(set)
+        self.var_nodes = defaultdict(list)
+        self.meta_sigs = set()
+        self.supported = True
+        self.in_meta = False
+        for state in self.states:
+            self.uses = set()
+            self.defs = set()
+            self.process_state(state)
+            self.state_uses[state] = self.uses
+            self.state_defs[state] = self.defs
+            edges, always = self._find_transitions(state.codes, frozenset())
+            if not always:
+                # the state is kept while no transition is taken
+                edges.append((state, self._unconditional_defs(state.codes)))
+            self.state_edges[state] = edges
+        for stm in fsm.reset_stms:
+            self.uses = set()
+            self.defs = set()
+            self.visit(stm)
+        if not self.supported:
+            return None
+        if any([t not in self.state_defs for edges in self.state_edges.values() for t, _ in edges]):
+            return None
+        return set(self.var_nodes.keys())
+
+    def _collect_external_sigs(self, hdlmodule, fsm_sigs):
+        '''Collects the signals that can be observed outside of a single fsm'''
+        externals = set()
+        for decls in hdlmodule.decls.values():
+            for decl in decls:
+                if decl.is_a(AHDL_SIGNAL_DECL):
+                    continue
+                externals |= self._find_sigs(decl)
+                self.symbols |= self._find_names(decl)
+        for inf in list(hdlmodule.interfaces.values()) + list(hdlmodule.accessors.values()):
+            if isinstance(getattr(inf, 'signal', None), Signal):
+                externals.add(inf.signal)
+        for sig, _, _ in hdlmodule.edge_detectors:
+            externals.add(sig)
+        seen = set()
+        for fsm, sigs in fsm_sigs.items():
+            externals |= fsm.outputs
+            if sigs is None:
+                # every signal of the unsupported fsm is regarded as external
+                sigs = set()
+                for stg in fsm.stgs:
+                    for state in stg.states:
+                        sigs |= self._find_sigs(state)
+                        self.symbols |= self._find_names(state)
+            externals |= sigs & seen
+            seen |= sigs
+        externals |= set([sig for sig in seen if sig.name in self.symbols])
+        return externals
+
+    def _walk(self, ahdl):
+        stack = [ahdl]
+        visited = set()
+        while stack:
+            v = stack.pop()
+            if isinstance(v, (list, tuple)):
+                stack.extend(v)
+            elif isinstance(v, (AHDL, Signal)):
+                if id(v) in visited:
+                    continue
+                visited.add(id(v))
+                yield v
+                if isinstance(v, AHDL):
+                    # never follow the states of the transitions
+                    stack.extend([elm for elm in v.__dict__.values()
+                                  if not isinstance(elm, AHDL_BLOCK) or not hasattr(elm, 'stg')])
+
+    def _find_sigs(self, ahdl):
+        return set([v for v in self._walk(ahdl) if isinstance(v, Signal)])
+
+    def _find_names(self, ahdl):
+        names = set()
+        for v in self._walk(ahdl):
+            if isinstance(v, AHDL_SYMBOL):
+                names |= set(re.findall(r'\w+', v.name))
+            elif isinstance(v, AHDL_INLINE):
+                names |= set(re.findall(r'\w+', v.code))
+        return names
+
+    def _unconditional_defs(self, codes):
+        return frozenset([c.dst.sig for c in codes
+                          if c.is_a(AHDL_MOVE) and c.dst.is_a(AHDL_VAR) and c.dst.sig.is_reg()])
+
+    def _find_transitions(self, codes, kills):
+        '''
+        Returns the transitions in the codes with the registers that are
+        always written when the transition is taken, and whether a transition is always taken
+        '''
+        kills = kills | self._unconditional_defs(codes)
+        edges = []
+        always = False
+        for c in codes:
+            if c.is_a(AHDL_TRANSITION):
+                edges.append((c.target, kills))
+                always = True
+            elif c.is_a(AHDL_IF):
+                all_always = True
+                for blk in c.blocks:
+                    blk_edges, blk_always = self._find_transitions(blk.codes, kills)
+                    edges.extend(blk_edges)
+                    all_always &= blk_always
+                last = c.conds[-1]
+                has_else = last is None or (last.is_a(AHDL_CONST) and last.value == 1)
+                always |= all_always and has_else
+            elif c.is_a(AHDL_META_WAIT):
+                wait_codes = c.codes + ([c.transition] if c.transition else [])
+                wait_edges, _ = self._find_transitions(wait_codes, kills)
+                edges.extend(wait_edges)
+            elif c.is_a(AHDL_CASE):
+                for item in c.items:
+                    item_edges, _ = self._find_transitions(item.block.codes, kills)
+                    edges.extend(item_edges)
+            elif c.is_a(AHDL_BLOCK):
+                blk_edges, blk_always = self._find_transitions(c.codes, kills)
+                edges.extend(blk_edges)
+                always |= blk_always
+        return edges, always
+
+    def _reduce_fsm(self, fsm, externals):
+        self._collect_fsm(fsm)
+        candidates = self._find_candidates(externals)
+        if len(candidates) < 2:
+            return []
+        bits = {sig: 1 << i for i, sig in enumerate(candidates)}
+
+        def mask(sigs):
+            m = 0
+            for sig in sigs:
+                m |= bits.get(sig, 0)
+            return m
+
+        uses = {}
+        defs = {}
+        edges = {}
+        for state in self.states:
+            uses[state] = mask(self._expand_nets(self.state_uses[state]))
+            defs[state] = mask(self.state_defs[state])
+            edges[state] = [(t, mask(k)) for t, k in self.state_edges[state]]
+        live_in, live_out = self._solve(uses, edges)
+        # the registers read before any write still need their own reset values
+        init_states = [stg.init_state for stg in fsm.stgs if stg.is_main()]
+        if not init_states or init_states[0] not in live_in:
+            return []
+        candidates = [sig for sig in candidates if not live_in[init_states[0]] & bits[sig]]
+
+        interferences = defaultdict(int)
+        starts = {}
+        for i, state in enumerate(self.states):
+            for sig in candidates:
+                bit = bits[sig]
+                if live_in[state] & bit:
+                    interferences[sig] |= live_in[state]
+                if defs[state] & bit:
+                    interferences[sig] |= live_out[state] | defs[state]
+                if (live_in[state] | defs[state]) & bit and sig not in starts:
+                    starts[sig] = i
+        for sig in candidates:
+            # the interferences must be symmetric
+            for other in candidates:
+                if interferences[other] & bits[sig]:
+                    interferences[sig] |= bits[other]
+
+        registers = []  # [(register, members mask)]
+        merged = {}
+        for sig in sorted(candidates, key=lambda s: (starts.get(s, len(self.states)), s.name)):
+            for i, (reg, members) in enumerate(registers):
+                if (reg.width == sig.width and reg.is_int() == sig.is_int() and
+                        not interferences[sig] & members):
+                    registers[i] = (reg, members | bits[sig])
+                    merged[sig] = reg
+                    break
+            else:
+                registers.append((sig, bits[sig]))
+        for sig, reg in merged.items():
+            logger.debug('{} shares the register with {}'.format(sig.name, reg.name))
+            self._replace_sig(fsm, sig, reg)
+        return list(merged.keys())
+
+    def _find_candidates(self, externals):
+        external_nets = [sig for sig in externals if sig.is_net()]
+        externals = externals | self._expand_nets(external_nets) | self.meta_sigs
+        declared = set()
+        for decl in self.hdlmodule.decls['']:
+            if type(decl) is AHDL_SIGNAL_DECL:
+                declared.add(decl.sig)
+        candidates = []
+        for sig in self.var_nodes.keys():
+            if (sig.is_reg() and sig.sym and sig.tags <= self.SHARABLE_TAGS and
+                    sig in declared and sig not in externals and
+                    self.hdlmodule.signals.get(sig.name) is sig):
+                candidates.append(sig)
+        return sorted(candidates)
+
+    def _expand_nets(self, sigs):
+        '''Returns the signals and the signals read through the nets in them'''
+        results = set()
+        worklist = list(sigs)
+        while worklist:
+            sig = worklist.pop()
+            if sig in results:
+                continue
+            results.add(sig)
+            if sig.is_net():
+                worklist.extend(self.net_uses[sig])
+        return results
+
+    def _solve(self, uses, edges):
+        live_in = {state: 0 for state in self.states}
+        changed = True
+        while changed:
+            changed = False
+            for state in reversed(self.states):
+                live = uses[state]
+                for t, kills in edges[state]:
+                    live |= live_in[t] & ~kills
+                if live != live_in[state]:
+                    live_in[state] = live
+                    changed = True
+        live_out = {}
+        for state in self.states:
+            live_out[state] = 0
+            for t, _ in edges[state]:
+                live_out[state] |= live_in[t]
+        return live_in, live_out
+
+    def _replace_sig(self, fsm, old, new):
+        fsm.reset_stms = [stm for stm in fsm.reset_stms
+                          if not (stm.dst.is_a(AHDL_VAR) and stm.dst.sig is old)]
+        for var in self.var_nodes[old]:
+            var.sig = new
+        self.hdlmodule.remove_signal_decl(old)
+        del self.hdlmodule.signals[old.name]
+        if old.sym:
+            self.hdlmodule.sym2sig[old.sym] = new
+        self.hdlmodule.sig2sym.pop(old, None)
+
+    def visit(self, ahdl):
+        if ahdl.is_a(self.UNSUPPORTED):
+            self.supported = False
+            return
+        return super().visit(ahdl)
+
+    def visit_AHDL_VAR(self, ahdl):
+        self.var_nodes[ahdl.sig].append(ahdl)
+        if self.in_meta:
+            self.meta_sigs.add(ahdl.sig)
+        if ahdl.ctx & Ctx.STORE:
+            self.defs.add(ahdl.sig)
+        else:
+            self.uses.add(ahdl.sig)
+
+    def visit_AHDL_MEMVAR(self, ahdl):
+        self.uses.add(ahdl.sig)
+
+    def visit_AHDL_SYMBOL(self, ahdl):
+        self.symbols |= set(re.findall(r'\w+', ahdl.name))
+
+    def visit_AHDL_INLINE(self, ahdl):
+        self.symbols |= set(re.findall(r'\w+', ahdl.code))
+
+    def visit_AHDL_MOVE(self, ahdl):
+        if ahdl.dst.is_a(AHDL_VAR) and ahdl.dst.sig.is_net():
+            # the net is driven continuously, so it is read where the net is read
+            uses = self.uses
+            self.uses = self.net_uses[ahdl.dst.sig]
+            self.visit(ahdl.src)
+            self.uses = uses
+            self.var_nodes[ahdl.dst.sig].append(ahdl.dst)
+        else:
+            super().visit_AHDL_MOVE(ahdl)
+
+    def visit_AHDL_META(self, ahdl):
+        self.in_meta = True
+        for arg in ahdl.args:
+            for sig in self._find_sigs(arg):
+                self.meta_sigs.add(sig)
+        super().visit_AHDL_META(ahdl)
+        self.in_meta = False
@@ -2,9 +2,10 @@
 from collections import defaultdict, deque
 from .common import fail, warn
 from .dataflow import DFNode
+from .env import env
 from .errors import Errors, Warnings
 from .graph import Graph
-from .latency import get_latency
+from .latency import get_latency, get_delay
 from .irvisitor import IRVisitor
 from .ir import *
 from .irhelper import has_exclusive_function
@@ -14,8 +15,6 @@ from .scope import Scope
 from logging import getLogger
 logger = getLogger(__name__)
 
-MAX_FUNC_UNIT = 100
-
 
 class Scheduler(object):
     def __init__(self):
@@ -28,6 +27,8 @@ class Scheduler(object):
         for dfg in self.scope.dfgs(bottom_up=True):
             if dfg.parent and dfg.synth_params['scheduling'] == 'pipeline':
                 scheduler_impl = PipelineScheduler()
+            elif dfg.synth_params['scheduling'] == 'balanced':
+                scheduler_impl = ForceDirectedScheduler()
             else:
                 scheduler_impl = BlockBoundedListScheduler()
             scheduler_impl.schedule(scope, dfg)
@@ -36,9 +37,11 @@ class Scheduler(object):
 class SchedulerImpl(object):
     def __init__(self):
         self.res_tables = {}
+        self.res_limits = {}
+        self.res_slots = {}  # {node:(begin, num of steps)}
         self.node_latency_map = {}  # {node:(max, min, actual)}
         self.node_seq_latency_map = {}
-        self.all_paths = []
+        self.node_arrivals = {}  # {node:the end of the chained delay (ns)}
         self.res_extractor = None
 
     def schedule(self, scope, dfg):
@@ -64,6 +67,8 @@ class SchedulerImpl(object):
                     succs = unique(succs)
                     worklist.append((succs, nextprio))
         longest_latency = self._schedule(dfg)
+        if self.node_arrivals:
+            self._log_chained_paths(dfg)
         if longest_latency > CALL_MINIMUM_STEP:
             scope.asap_latency = longest_latency
         else:
@@ -118,13 +123,34 @@ class SchedulerImpl(object):
         latest_node = max(nodes, key=lambda p: p.end)
         return latest_node
 
-    def _is_resource_full(self, res, scheduled_resources):
-        # TODO: Limiting resources by scheduler is a future task
-        #if isinstance(res, str):
-        #    return len(scheduled_resources) >= MAX_FUNC_UNIT
-        #elif isinstance(res, Scope):
-        #    return len(scheduled_resources) >= MAX_FUNC_UNIT
-        return 0
+    def _set_resource_limits(self, dfg):
+        self.res_limits = dict(env.config.resource_limits)
+        for name, num in self.res_limits.items():
+            if not isinstance(num, int) or isinstance(num, bool) or num < 1:
+                fail(None, Errors.RULE_INVALID_RESOURCE_LIMIT, [repr(num), name])
+        resources = dfg.synth_params['resources']
+        if not resources:
+            return
+        for item in resources.split(','):
+            name, _, num = item.partition(':')
+            if not name.strip() or not num.strip().isdigit() or int(num) < 1:
+                fail(dfg.region.head.stms[0], Errors.RULE_INVALID_RESOURCES, [resources])
+            self.res_limits[name.strip()] = int(num)
+
+    def _clock_period(self):
+        period = env.config.clock_period
+        if period is None:
+            return None
+        if not isinstance(period, (int, float)) or isinstance(period, bool) or period <= 0:
+            fail(None, Errors.RULE_INVALID_CLOCK_PERIOD, [repr(period)])
+        return period
+
+    def _resource_limit(self, res):
+        if isinstance(res, str):
+            return self.res_limits.get(res)
+        elif isinstance(res, Scope) and res.is_function_module():
+            return self.res_limits.get(res.orig_name)
+        return None
 
     def _str_res(self, res):
         if isinstance(res, str):
@@ -132,6 +158,20 @@ class SchedulerImpl(object):
         elif isinstance(res, Scope):
             return res.name
 
+    def _find_free_instance(self, table, time, steps):
+        used = set()
+        for i in range(steps):
+            used.update([n.instance_num for n in table[time + i]])
+        inst = 0
+        while inst in used:
+            inst += 1
+        return inst
+
+    def _release_resource(self, node, table):
+        begin, steps = self.res_slots.pop(node)
+        for i in range(steps):
+            table[begin + i].remove(node)
+
     def _get_earliest_res_free_time(self, node, time, latency):
         resources = self.res_extractor.ops[node].keys()
         #TODO operator chaining?
@@ -140,33 +180,37 @@ class SchedulerImpl(object):
         assert len(resources) <= 1
         if resources:
             res = list(resources)[0]
-            if res not in self.res_tables:
+            # the steps of different blocks never run at the same time
+            key = (node.tag.block, res)
+            if key not in self.res_tables:
                 table = defaultdict(list)
-                self.res_tables[res] = table
+                self.res_tables[key] = table
             else:
-                table = self.res_tables[res]
-
-            scheduled_resources = table[time]
-            if node in scheduled_resources:
-                #already scheduled
-                return time
-
-            while self._is_resource_full(res, scheduled_resources):
+                table = self.res_tables[key]
+
+            if node in self.res_slots:
+                if self.res_slots[node][0] == time:
+                    #already scheduled
+                    return time
+                self._release_resource(node, table)
+
+            # an instance is occupied while the node is running
+            steps = latency if latency != 0 else 1
+            limit = self._resource_limit(res)
+            inst = self._find_free_instance(table, time, steps)
+            while limit is not None and inst >= limit:
                 logger.debug("!!! resource {}'s slot '{}' is full !!!".
                              format(self._str_res(res), time))
-                assert False, 'Rescheduling due to lack of resources is not supported yet'
                 time += 1
-                scheduled_resources = table[time]
-
-            node.instance_num = len(scheduled_resources)
+                inst = self._find_free_instance(table, time, steps)
+            node.instance_num = inst
             #logger.debug("{} is scheduled to {}, instance_num {}".
             #             format(node, time, node.instance_num))
 
             # fill scheduled_resources table
-            n = latency if latency != 0 else 1
-            for i in range(n):
-                scheduled_resources = table[time + i]
-                scheduled_resources.append(node)
+            for i in range(steps):
+                table[time + i].append(node)
+            self.res_slots[node] = (time, steps)
         return time
 
     def _calc_latency(self, dfg):
@@ -188,59 +232,110 @@ class SchedulerImpl(object):
             else:
                 self.node_latency_map[node] = (def_l, def_l, def_l)
             self.node_seq_latency_map[node] = seq_l
-
-    def _adjust_latency(self, paths, expected):
-        for path in paths:
-            path_latencies = []
-            for n in path:
-                m, _, _ = self.node_latency_map[n]
-                path_latencies.append(m)
-            path_latency = sum(path_latencies)
-            if expected > path_latency:
-                # we don't have to adjust latency
-                continue
-            diff = path_latency - expected
-            fixed = set()
-            succeeded = True
-            # try to reduce latency
-            while diff:
-                for i, n in enumerate(path):
-                    if n in fixed:
-                        continue
-                    max_l, min_l, _ = self.node_latency_map[n]
-                    if min_l < path_latencies[i]:
-                        path_latencies[i] -= 1
-                        self.node_latency_map[n] = (max_l, min_l, path_latencies[i])
-                        diff -= 1
-                    else:
-                        fixed.add(n)
-                if len(fixed) == len(path):
-                    # scheduling has failed
-                    succeeded = False
+        period = self._clock_period()
+        if period is not None:
+            self._chain_in_period(dfg, period)
+
+    def _chained_preds(self, dfg, node):
+        return [p for p in dfg.preds_typ_without_back(node, 'DefUse')
+                if self.node_latency_map[p][2] == 0]
+
+    def _can_be_registered(self, node):
+        if node.tag.is_a(MOVE):
+            var = node.tag.dst.symbol()
+        elif node.tag.is_a(PHIBase):
+            var = node.tag.var.symbol()
+        else:
+            return False
+        return var.is_alias() and not var.is_condition() and not var.typ.is_seq()
+
+    def _chain_in_period(self, dfg, period):
+        '''
+        Chains the operations of zero latency in a state as long as
+        the accumulated delay fits in the clock period.
+        The alias operations which cycle='any' or 'less:N' registers are
+        chained as well, so that more operations are packed in a state.
+        If a chain does not fit, its preds take a cycle to hold their results in registers.
+        '''
+        packs = not self.scope.is_testbench()
+        for node in dfg.get_priority_ordered_nodes():
+            if packs and self.node_latency_map[node] == (1, 0, 1) and self._can_be_registered(node):
+                self.node_latency_map[node] = (0, 0, 0)
+            delay = get_delay(node.tag)
+            preds = self._chained_preds(dfg, node)
+            arrival = max([self.node_arrivals[p] for p in preds], default=0.0)
+            if arrival + delay > period:
+                for p in preds:
+                    if self._can_be_registered(p):
+                        self.node_latency_map[p] = (1, 0, 1)
+                preds = self._chained_preds(dfg, node)
+                arrival = max([self.node_arrivals[p] for p in preds], default=0.0)
+            self.node_arrivals[node] = arrival + delay
+
+    def _log_chained_paths(self, dfg):
+        '''Logs the critical chained path of each state'''
+        period = env.config.clock_period
+        states = defaultdict(list)
+        for node in dfg.get_scheduled_nodes():
+            states[(node.tag.block, node.begin)].append(node)
+        logger.debug('chained paths of {} (clock period {:.2f}ns)'.format(dfg.name, period))
+        for (block, step), nodes in states.items():
+            node = max(nodes, key=lambda n: self.node_arrivals[n])
+            path = [node]
+            while True:
+                preds = [p for p in self._chained_preds(dfg, node) if p.begin == node.begin]
+                if not preds:
                     break
-            if not succeeded:
-                return False, expected + diff
+                node = max(preds, key=lambda p: self.node_arrivals[p])
+                path.insert(0, node)
+            arrival = self.node_arrivals[path[-1]]
+            logger.debug('{}:{} {:.2f}ns{} {}'.format(block.name, step, arrival,
+                                                     ' (violated)' if arrival > period else '',
+                                                     ' -> '.join([str(n.tag) for n in path])))
+
+    def _defuse_preds(self, dfg, node, nodes):
+        return [p for p in dfg.preds_typ_without_back(node, 'DefUse') if p in nodes]
+
+    def _defuse_succs(self, dfg, node, nodes):
+        return [s for s in dfg.succs_typ_without_back(node, 'DefUse') if s in nodes]
+
+    def _adjust_latency(self, dfg, nodes, expected):
+        '''
+        Reduces the latencies of the nodes so that every DefUse path
+        in the nodes takes less than or equal to the expected latency.
+        The nodes must be in topological order.
+        '''
+        node_set = set(nodes)
+        # the latency from a node to the end of the paths if all nodes take the minimum latency
+        min_tails = {}
+        for n in reversed(nodes):
+            _, min_l, _ = self.node_latency_map[n]
+            succs = self._defuse_succs(dfg, n, node_set)
+            min_tails[n] = min_l + max([min_tails[s] for s in succs], default=0)
+        min_latency = max(min_tails.values(), default=0)
+        if min_latency > expected:
+            return False, min_latency
+        # walk the nodes in topological order and reduce the latency of a node
+        # only if it has not enough slack for the rest of the path
+        ends = {}
+        for n in nodes:
+            max_l, min_l, actual = self.node_latency_map[n]
+            preds = self._defuse_preds(dfg, n, node_set)
+            begin = max([ends[p] for p in preds], default=0)
+            slack = expected - begin - (min_tails[n] - min_l)
+            if slack < actual:
+                assert min_l <= slack
+                actual = slack
+                self.node_latency_map[n] = (max_l, min_l, actual)
+            ends[n] = begin + actual
         return True, expected
 
     def _try_adjust_latency(self, dfg, expected):
-        for path in dfg.trace_all_paths(lambda n: dfg.succs_typ_without_back(n, 'DefUse')):
-            self.all_paths.append(path)
-        ret, actual = self._adjust_latency(self.all_paths, expected)
+        nodes = dfg.get_priority_ordered_nodes()
+        ret, actual = self._adjust_latency(dfg, nodes, expected)
         if not ret:
             assert False, 'scheduling has failed. the cycle must be greater equal {}'.format(actual)
 
-    def _max_latency(self, paths):
-        max_latency = 0
-        for path in paths:
-            path_latencies = []
-            for n in path:
-                m, _, _ = self.node_latency_map[n]
-                path_latencies.append(m)
-            path_latency = sum(path_latencies)
-            if path_latency > max_latency:
-                max_latency = path_latency
-        return max_latency
-
     def _remove_alias_if_needed(self, dfg):
         for n in dfg.nodes:
             if n not in self.node_latency_map:
@@ -273,6 +368,7 @@ class SchedulerImpl(object):
 
 class BlockBoundedListScheduler(SchedulerImpl):
     def _schedule(self, dfg):
+        self._set_resource_limits(dfg)
         self._schedule_cycles(dfg)
         self._remove_alias_if_needed(dfg)
 
@@ -375,7 +471,147 @@ class BlockBoundedListScheduler(SchedulerImpl):
         return scheduled_time
 
 
+class ForceDirectedScheduler(BlockBoundedListScheduler):
+    '''
+    Balances the usage of the functional units in each block by
+    force-directed scheduling, then the list scheduler places the nodes
+    no earlier than the steps chosen by it.
+    '''
+    def _schedule(self, dfg):
+        self._set_resource_limits(dfg)
+        self._schedule_cycles(dfg)
+        self._remove_alias_if_needed(dfg)
+
+        self.release_times = {}
+        block_nodes = self._group_nodes_by_block(dfg)
+        longest_latency = 0
+        for block, nodes in block_nodes.items():
+            nodes = sorted(nodes, key=lambda n: (n.priority, n.stm_index))
+            self.release_times.update(self._force_directed_schedule(dfg, nodes))
+            latency = self._list_schedule_with_block_bound(dfg, nodes, block, 0)
+            if longest_latency < latency:
+                longest_latency = latency
+        for (block, res), table in self.res_tables.items():
+            usage = max([len(ns) for ns in table.values()], default=0)
+            logger.debug('{} uses {} {} at most'.format(block.name, usage, self._str_res(res)))
+        return longest_latency
+
+    def _node_sched_with_block_bound(self, dfg, node, block):
+        scheduled_time = super()._node_sched_with_block_bound(dfg, node, block)
+        return max(scheduled_time, self.release_times.get(node, 0))
+
+    def _alias_leaves(self, dfg, node):
+        stm = node.tag
+        if not stm.is_a([MOVE, PHIBase]):
+            return [node]
+        var = node.tag.dst.symbol() if node.tag.is_a(MOVE) else node.tag.var.symbol()
+        if not var.is_alias():
+            return [node]
+        succs = dfg.succs_typ_without_back(node, 'DefUse')
+        if not succs:
+            return [node]
+        return list(itertools.chain.from_iterable([self._alias_leaves(dfg, s) for s in succs]))
+
+    def _make_constraints(self, dfg, nodes):
+        '''
+        Makes the constraints 'node.begin >= pred.begin + distance'
+        in the same way as _node_sched_with_block_bound
+        '''
+        order = {n: i for i, n in enumerate(nodes)}
+        constraints = defaultdict(list)
+        for n in nodes:
+            dists = []
+            for p in dfg.preds_typ_without_back(n, 'DefUse'):
+                dists.append((p, self.node_latency_map[p][2]))
+            for p in dfg.preds_typ_without_back(n, 'Seq'):
+                if n.tag.is_a([JUMP, CJUMP, MCJUMP]) or has_exclusive_function(n.tag):
+                    dists.append((p, self.node_latency_map[p][2]))
+                else:
+                    dists.append((p, self.node_seq_latency_map[p]))
+            for p in dfg.preds_typ_without_back(n, 'UseDef'):
+                if p in order:
+                    dists.extend([(a, 0) for a in self._alias_leaves(dfg, p)])
+            constraints[n] = [(p, d) for p, d in dists if p in order and order[p] < order[n]]
+        return constraints
+
+    def _time_frames(self, nodes, constraints, fixed):
+        asap = {}
+        for n in nodes:
+            if n in fixed:
+                asap[n] = fixed[n]
+            else:
+                asap[n] = max([asap[p] + d for p, d in constraints[n]], default=0)
+        steps = {n: max(self.node_latency_map[n][2], 1) for n in nodes}
+        length = max([asap[n] + steps[n] for n in nodes], default=0)
+        alap = {n: length - steps[n] for n in nodes}
+        for n in reversed(nodes):
+            if n in fixed:
+                alap[n] = fixed[n]
+            for p, d in constraints[n]:
+                alap[p] = min(alap[p], alap[n] - d)
+        return asap, alap
+
+    def _distribution(self, node, asap, alap):
+        '''Returns the probabilities that the node occupies its resource at each step'''
+        steps = max(self.node_latency_map[node][2], 1)
+        prob = 1.0 / (alap[node] - asap[node] + 1)
+        dist = defaultdict(float)
+        for t in range(asap[node], alap[node] + 1):
+            for i in range(steps):
+                dist[t + i] += prob
+        return dist
+
+    def _force_directed_schedule(self, dfg, nodes):
+        '''
+        Decides the steps of the nodes using the functional units one by one.
+        Each time the node and the step with the least force is chosen,
+        that is the one which spreads the expected usage of the units the most.
+        '''
+        targets = []
+        for n in nodes:
+            ops = self.res_extractor.ops.get(n)
+            if ops:
+                assert len(ops) <= 1
+                res, num = list(ops.items())[0]
+                targets.append((n, res, num))
+        if len(targets) <= 1:
+            return {}
+        constraints = self._make_constraints(dfg, nodes)
+        fixed = {}
+        asap, alap = self._time_frames(nodes, constraints, fixed)
+        while len(fixed) < len(targets):
+            dists = {n: self._distribution(n, asap, alap) for n, _, _ in targets}
+            graphs = defaultdict(lambda: defaultdict(float))
+            for n, res, num in targets:
+                for t, p in dists[n].items():
+                    graphs[res][t] += num * p
+            candidates = []
+            for n, _, _ in targets:
+                if n in fixed:
+                    continue
+                for t in range(asap[n], alap[n] + 1):
+                    fixed[n] = t
+                    new_asap, new_alap = self._time_frames(nodes, constraints, fixed)
+                    del fixed[n]
+                    force = 0.0
+                    for m, res, num in targets:
+                        if (new_asap[m], new_alap[m]) == (asap[m], alap[m]):
+                            continue
+                        new_dist = self._distribution(m, new_asap, new_alap)
+                        for step in set(new_dist.keys()) | set(dists[m].keys()):
+                            force += num * graphs[res][step] * (new_dist[step] - dists[m][step])
+                    candidates.append((round(force, 9), t, n.priority, n.stm_index, n))
+            force, t, _, _, n = min(candidates, key=lambda c: c[:4])
+            logger.debug('force {:.3f} at {} {}'.format(force, t, n))
+            fixed[n] = t
+            asap, alap = self._time_frames(nodes, constraints, fixed)
+        return {n: asap[n] for n, _, _ in targets}
+
+
 class PipelineScheduler(SchedulerImpl):
+    # the number of placement rounds per conflict node before giving up an II
+    BUDGET_RATIO = 4
+
     def _schedule(self, dfg):
         self._schedule_cycles(dfg)
         self._schedule_ii(dfg)
@@ -397,6 +633,11 @@ class PipelineScheduler(SchedulerImpl):
         logger.debug('II = ' + str(dfg.ii))
         return longest_latency
 
+    def _chain_in_period(self, dfg, period):
+        # A register in a chain adds a stage to the loop-carried dependencies of the pipeline,
+        # so the operations of a pipelined loop are chained regardless of the clock period
+        pass
+
     def _make_conflict_res_table(self, nodes):
         conflict_res_table = defaultdict(list)
         self._extend_conflict_res_table(conflict_res_table, nodes, self.res_extractor.mems)
@@ -422,32 +663,62 @@ class PipelineScheduler(SchedulerImpl):
 
     def _schedule_ii(self, dfg):
         initiation_interval = int(dfg.synth_params['ii'])
-        if not self.all_paths:
-            for path in dfg.trace_all_paths(lambda n: dfg.succs_typ_without_back(n, 'DefUse')):
-                self.all_paths.append(path)
-        induction_paths = self._find_induction_paths(self.all_paths)
+        self.induction_paths = induction_paths = self._find_induction_paths(dfg)
         if initiation_interval < 0:
-            latency = self._max_latency(induction_paths)
+            # RecMII
+            latency = max([self._max_latency(dfg, nodes) for nodes in induction_paths], default=0)
             dfg.ii = latency if latency > 0 else 1
         else:
-            ret, actual = self._adjust_latency(induction_paths, initiation_interval)
-            if not ret:
-                assert False, 'scheduling of II has failed'
-            dfg.ii = actual
-
-    def _find_induction_paths(self, paths):
+            for nodes in induction_paths:
+                ret, actual = self._adjust_latency(dfg, nodes, initiation_interval)
+                if not ret:
+                    fail(dfg.region.head.stms[0],
+                         Errors.RULE_PIPELINE_BREAKS_RECURRENCE, [initiation_interval])
+            dfg.ii = initiation_interval
+
+    def _max_latency(self, dfg, nodes):
+        '''Returns the longest latency of DefUse paths in the nodes which are in topological order'''
+        node_set = set(nodes)
+        ends = {}
+        for n in nodes:
+            m, _, _ = self.node_latency_map[n]
+            preds = self._defuse_preds(dfg, n, node_set)
+            ends[n] = m + max([ends[p] for p in preds], default=0)
+        return max(ends.values(), default=0)
+
+    def _find_induction_paths(self, dfg):
+        '''
+        Returns the nodes on the DefUse paths from the uses of an induction variable
+        to its definition at the end of the paths, in topological order, for each induction variable
+        '''
+        nodes = dfg.get_priority_ordered_nodes()
+        # the paths are traced from the nodes of the highest priority
+        reachables = set()
+        for n in nodes:
+            if n.priority == 0 or self._defuse_preds(dfg, n, reachables):
+                reachables.add(n)
+        nodes = [n for n in nodes if n in reachables]
         induction_paths = []
-        for path in paths:
-            last_node = path[-1]
+        for last_node in nodes:
+            if dfg.succs_typ_without_back(last_node, 'DefUse'):
+                continue
             if not last_node.defs:
                 continue
             d = last_node.defs[0]
             if not d.is_induction():
                 continue
-            for i, p in enumerate(path):
-                if d in p.uses:
-                    induction_paths.append(path[i:])
-                    break
+            ancestors = {last_node}
+            for n in reversed(nodes):
+                if self._defuse_succs(dfg, n, ancestors):
+                    ancestors.add(n)
+            path_nodes = set()
+            for n in nodes:
+                if n not in ancestors:
+                    continue
+                if d in n.uses or self._defuse_preds(dfg, n, path_nodes):
+                    path_nodes.add(n)
+            if path_nodes:
+                induction_paths.append([n for n in nodes if n in path_nodes])
         return induction_paths
 
     def _get_using_resources(self, node):
@@ -504,6 +775,7 @@ class PipelineScheduler(SchedulerImpl):
 
     def _reschedule_for_conflict(self, dfg, conflict_res_table, longest_latency):
         self.cgraph = ConflictGraphBuilder(self.scope, dfg).build(conflict_res_table)
+        # ResMII
         conflict_n = self.max_cnode_num(self.cgraph)
         if conflict_n == 0:
             return longest_latency
@@ -538,7 +810,59 @@ class PipelineScheduler(SchedulerImpl):
         cnode_map = defaultdict(list)
         for cnode in cnodes:
             cnode_map[cnode.res].append(cnode)
+
+        # search the smallest feasible II from MII
+        if request_ii == -1:
+            max_ii = dfg.ii + longest_latency + len(cnodes)
+        else:
+            max_ii = dfg.ii
+        budget = self.BUDGET_RATIO * len(cnodes)
+        # if the first placement breaks a recurrence,
+        # retry with the nodes on the recurrences placed first
+        cnode_maps = [cnode_map]
+        rec_first_map = self._recurrence_first_cnode_map(cnode_map)
+        if rec_first_map != cnode_map:
+            cnode_maps.append(rec_first_map)
+        node_times = {n: (n.begin, n.end) for n in dfg.nodes}
         ii = dfg.ii
+        found = False
+        while not found:
+            if ii == max_ii:
+                budget = None
+            for cnode_map in cnode_maps:
+                latency = self._modulo_schedule(dfg, cnode_map, ii, set(next_candidates),
+                                                longest_latency, budget)
+                if latency >= 0 and self._satisfies_recurrences(ii):
+                    found = True
+                    break
+                if ii == max_ii and cnode_map is cnode_maps[-1]:
+                    fail(dfg.region.head.stms[0],
+                         Errors.RULE_PIPELINE_BREAKS_RECURRENCE, [ii])
+                for n, (begin, end) in node_times.items():
+                    n.begin = begin
+                    n.end = end
+            else:
+                logger.debug('II {} is infeasible'.format(ii))
+                ii += 1
+        dfg.ii = ii
+        self._log_modulo_reservation_table(cnode_map, ii)
+        return latency
+
+    def _recurrence_first_cnode_map(self, cnode_map):
+        rec_nodes = set(itertools.chain(*self.induction_paths))
+
+        def is_on_recurrence(cnode):
+            return any([dnode in rec_nodes for dnode in cnode.items])
+        return {res: sorted(cnodes, key=lambda cn: not is_on_recurrence(cn))
+                for res, cnodes in cnode_map.items()}
+
+    def _modulo_schedule(self, dfg, cnode_map, ii, next_candidates, longest_latency, budget):
+        '''
+        Places the conflict nodes so that the nodes using the same resource
+        are in different states of II, and returns the latency.
+        Returns -1 if the placement is not settled within the budget rounds.
+        '''
+        rounds = 0
         while True:
             for res, nodes in cnode_map.items():
                 remain_states = [i for i in range(ii)]
@@ -562,6 +886,9 @@ class PipelineScheduler(SchedulerImpl):
                             dnode.begin = new_begin
                             next_candidates.add(dnode)
             if next_candidates:
+                rounds += 1
+                if budget is not None and rounds > budget:
+                    return -1
                 longest_latency = self._list_schedule_for_pipeline(dfg,
                                                                    next_candidates,
                                                                    longest_latency)
@@ -571,6 +898,32 @@ class PipelineScheduler(SchedulerImpl):
                 break
         return longest_latency
 
+    def _satisfies_recurrences(self, ii):
+        '''
+        Checks whether the next iteration can use the loop-carried value,
+        i.e. the definition of an induction variable ends within II steps from its first use.
+        '''
+        for nodes in self.induction_paths:
+            last_node = nodes[-1]
+            d = last_node.defs[0]
+            # the nodes not scheduled yet are ignored
+            begins = [n.begin for n in nodes if d in n.uses and n.begin >= 0]
+            if last_node.begin >= 0 and last_node.end - min(begins, default=last_node.end) > ii:
+                return False
+        return True
+
+    def _log_modulo_reservation_table(self, cnode_map, ii):
+        logger.debug('modulo reservation table (II = {})'.format(ii))
+        for res, cnodes in cnode_map.items():
+            table = {cnode.state: cnode for cnode in cnodes}
+            slots = []
+            for state in range(ii):
+                if state in table:
+                    slots.append(', '.join([str(dnode.tag) for dnode in table[state].items]))
+                else:
+                    slots.append('-')
+            logger.debug('{}: {}'.format(res, ' | '.join(slots)))
+
     def _node_sched_pipeline(self, dfg, node):
         preds = dfg.preds_without_back(node)
         if preds:
@@ -781,8 +1134,8 @@ class ConflictGraphBuilder(object):
             begin1 = max([item.begin for item in e.dst.items])
             begin = (begin0, begin1) if begin0 <= begin1 else (begin1, begin0)
             distance = (begin1 - begin0) if begin0 <= begin1 else (begin0 - begin1)
-            lineno0 = min([item.tag.lineno for item in e.src.items])
-            lineno1 = min([item.tag.lineno for item in e.dst.items])
+            lineno0 = min([item.tag.loc.lineno for item in e.src.items])
+            lineno1 = min([item.tag.loc.lineno for item in e.dst.items])
             lineno = (lineno0, lineno1) if lineno0 <= lineno1 else (lineno1, lineno0)
             # In order to avoid crossover edge, 'begin' must be given priority
             return (distance, begin, lineno)
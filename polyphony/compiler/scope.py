@@ -22,6 +22,9 @@ FunctionParam = namedtuple('FunctionParam', ('sym', 'copy', 'defval'))
 
 class Scope(Tagged):
     ordered_scopes = []
+    # the states of env that the order of scopes and ordered_scopes were computed from
+    scope_order_key = None
+    ordered_scopes_key = None
     TAGS = {
         'global', 'function', 'class', 'method', 'ctor',
         'callable', 'returnable', 'mutable', 'inherited', 'predicate',
@@ -33,13 +36,12 @@ class Scope(Tagged):
         'inlinelib',
         'package', 'directory'
     }
-    scope_id = 0
 
     @classmethod
     def create(cls, parent, name, tags, lineno=0, origin=None):
         if name is None:
-            name = "unnamed_scope" + str(cls.scope_id)
-        s = Scope(parent, name, tags, lineno, cls.scope_id)
+            name = "unnamed_scope" + str(env.scope_id)
+        s = Scope(parent, name, tags, lineno, env.scope_id)
         if s.name in env.scopes:
             env.append_scope(s)
             fail((env.scope_file_map[s], lineno), Errors.REDEFINED_NAME, {name})
@@ -47,7 +49,7 @@ class Scope(Tagged):
         if origin:
             s.origin = origin
             env.scope_file_map[s] = env.scope_file_map[origin]
-        cls.scope_id += 1
+        env.scope_id += 1
         return s
 
     @classmethod
@@ -93,12 +95,21 @@ class Scope(Tagged):
             return scopes
 
         cls.reorder_scopes()
-        cls.ordered_scopes = sorted(env.scopes.values())
+        if cls.ordered_scopes_key != cls.scope_order_key:
+            cls.ordered_scopes = sorted(env.scopes.values())
+            cls.ordered_scopes_key = cls.scope_order_key
 
         return ret_helper()
 
     @classmethod
     def reorder_scopes(cls):
+        g = env.depend_graph
+        # the order is only changed by a change of the scopes or the dependencies
+        key = (env.scopes_version, g, g.version if g else 0)
+        if cls.scope_order_key == key:
+            return
+        cls.scope_order_key = key
+
         # hierarchical order
         def set_h_order(scope, order):
             if order > scope.order[0]:
@@ -113,13 +124,14 @@ class Scope(Tagged):
                 s.order = (0, 0)
                 for f in s.children:
                     set_h_order(f, 1)
-        if env.depend_graph:
-            nodes = env.depend_graph.bfs_ordered_nodes()
+        if g:
+            nodes = g.bfs_ordered_nodes()
+            d_orders = {n: i for i, n in enumerate(nodes)}
             for s in nodes:
-                d_order = nodes.index(s)
-                preds = env.depend_graph.preds(s)
+                d_order = d_orders[s]
+                preds = g.preds(s)
                 if preds:
-                    preds_max_order = max([nodes.index(p) for p in preds])
+                    preds_max_order = max([d_orders[p] for p in preds])
                 else:
                     preds_max_order = 0
                 if d_order < preds_max_order:
@@ -503,6 +515,7 @@ class Scope(Tagged):
     def append_child(self, child_scope):
         if child_scope not in self.children:
             self.children.append(child_scope)
+            env.scopes_version += 1
 
     def add_param(self, sym, copy, defval):
         self.params.append(FunctionParam(sym, copy, defval))
@@ -631,10 +644,9 @@ class Scope(Tagged):
                 self.branch_graph.add_edge(v, k)
 
     def has_branch_edge(self, stm0, stm1):
-        if stm0 < stm1:
-            return self.branch_graph.find_edge(stm0, stm1) is not None
-        else:
-            return self.branch_graph.find_edge(stm1, stm0) is not None
+        # the positions of the statements may have changed since the edge was added
+        return (self.branch_graph.find_edge(stm0, stm1) is not None or
+                self.branch_graph.find_edge(stm1, stm0) is not None)
 
 
 class SymbolReplacer(IRVisitor):
@@ -357,7 +357,7 @@ class TupleSSATransformer(SSATransformerBase):
             phis = blk.collect_stms(PHI)
             for phi in phis:
                 uses = usedef.get_stms_using(phi.var.qualified_symbol())
-                for use in uses:
+                for use in sorted(uses):
                     self._insert_use_phi(phi, use)
 
     def _insert_use_phi(self, phi, use_stm):
@@ -7,7 +7,6 @@ logger = getLogger(__name__)
 
 class Symbol(Tagged):
     __slots__ = ['id', 'name', 'scope', 'typ', 'ancestor']
-    all_symbols = []
 
     TAGS = {
         'temp', 'param', 'return', 'condition', 'induction', 'alias',
@@ -20,12 +19,12 @@ class Symbol(Tagged):
     def unique_name(cls, prefix=None):
         if not prefix:
             prefix = cls.temp_prefix
-        return '{}{}'.format(prefix, len(cls.all_symbols))
+        return '{}{}'.format(prefix, len(env.all_symbols))
 
     @classmethod
     def dump(cls):
         logger.debug('All symbol instances ----------------')
-        for sym in cls.all_symbols:
+        for sym in env.all_symbols:
             s = str(sym) + '\n'
             s += '  defs\n'
             for d in sym.defs:
@@ -42,12 +41,12 @@ class Symbol(Tagged):
 
     def __init__(self, name, scope, tags, typ=Type.undef_t):
         super().__init__(tags)
-        self.id = len(Symbol.all_symbols)
+        self.id = len(env.all_symbols)
         self.name = name
         self.scope = scope
         self.typ = typ
         self.ancestor = None
-        Symbol.all_symbols.append(self)
+        env.all_symbols.append(self)
 
     def __str__(self):
         #return '{}:{}({}:{})'.format(self.name, self.typ, self.id, self.scope.orig_name)
@@ -9,11 +9,13 @@ class DefaultSynthParamSetter(object):
         'scheduling':'sequential',
         'cycle':'any',
         'ii':1,
+        'resources':'',
     }
     scope_params = {
         'scheduling':'parallel',
         'cycle':'minimum',
         'ii':-1,
+        'resources':'',
     }
 
     def process(self, scope):
@@ -35,6 +37,7 @@ def make_synth_params():
     di['scheduling'] = ''
     di['cycle'] = ''
     di['ii'] = 0
+    di['resources'] = ''
     return di
 
 
@@ -875,7 +875,7 @@ class SynthesisParamChecker(object):
                 continue
             if sym.typ.get_scope().orig_name.startswith('Port') and sym.typ.get_protocol() == 'none':
                 continue
-            usestms = sorted(scope.usedef.get_stms_using(sym), key=lambda s: s.program_order())
+            usestms = sorted(scope.usedef.get_stms_using(sym), key=lambda s: (s.program_order(), s.sort_key()))
             usestms = [stm for stm in usestms if stm.block in loop.blocks()]
             readstms = []
             for stm in usestms:
@@ -97,6 +97,9 @@ class LoopUnroller(object):
             is_full_unroll = False
         #unroll_trip = initial_trip // factor
         origin_body = loop.bodies[0]
+        # usedef is updated while unrolling, so the uses outside the loop are taken here
+        outer_usestms = {u: self.scope.usedef.get_stms_using(u).copy() for u in loop.outer_uses}
+        body_defsyms = self.scope.usedef.get_syms_defined_at(origin_body)
         defsyms = self.scope.usedef.get_syms_defined_at(loop.head)
         origin_ivs = [sym for sym in defsyms if sym.is_induction()]
         new_ivs = self._new_ivs(factor, origin_ivs, is_full_unroll)
@@ -110,9 +113,8 @@ class LoopUnroller(object):
                                                                              loop_step,
                                                                              factor,
                                                                              new_ivs)
-        defsyms = self.scope.usedef.get_syms_defined_at(origin_body)
         unroll_blks = self._make_unrolling_blocks(origin_body,
-                                                  defsyms,
+                                                  body_defsyms,
                                                   new_ivs,
                                                   iv_updates,
                                                   sym_map,
@@ -120,7 +122,7 @@ class LoopUnroller(object):
                                                   unroll_head)
         if is_full_unroll:
             self._reconnect_full_unroll_blocks(loop, unroll_head, unroll_blks)
-            self._replace_outer_uses(loop, new_ivs, factor, {})
+            self._replace_outer_uses(loop, outer_usestms, new_ivs, factor, {})
             # emigrate unrolled blocks
             parent = self.scope.parent_region(loop)
             for b in [unroll_head] + unroll_blks:
@@ -154,7 +156,7 @@ class LoopUnroller(object):
                 parent.append_body(remain_start_blk)
             else:
                 self.scope.remove_region(loop)
-                self._replace_outer_uses(loop, new_ivs, 0, sym_map)
+                self._replace_outer_uses(loop, outer_usestms, new_ivs, 0, sym_map)
             for blk in [unroll_head] + unroll_blks:
                 del blk.synth_params['unroll']
         return True
@@ -350,11 +352,11 @@ class LoopUnroller(object):
                 symreplacer.visit(stm)
             pred_blk.succs = [new_blk]
             jmp = pred_blk.stms[-1]
-            jmp.typ = ''
             if jmp.is_a(CJUMP):
                 jmp.true = new_blk
             else:
                 assert jmp.is_a(JUMP)
+                jmp.typ = ''
                 jmp.target = new_blk
             new_blk.preds = [pred_blk]
             pred_blk = new_blk
@@ -372,10 +374,9 @@ class LoopUnroller(object):
                     new_iv.del_tag('induction')
         return new_iv_map
 
-    def _replace_outer_uses(self, loop, new_ivs, index, sym_map):
+    def _replace_outer_uses(self, loop, outer_usestms, new_ivs, index, sym_map):
         for u in loop.outer_uses:
-            usestms = self.scope.usedef.get_stms_using(u)
-            for ustm in usestms:
+            for ustm in outer_usestms[u]:
                 if u in new_ivs:
                     ustm.replace(u, new_ivs[u][index])
                 if u in sym_map:
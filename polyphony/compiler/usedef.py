@@ -41,10 +41,14 @@ class UseDefTable(object):
         self._def_sym2stm[var.symbol()].discard(stm)
         self._def_qsym2stm[var.qualified_symbol()].discard(stm)
         self._def_var2stm[var].discard(stm)
-        self._def_sym2blk[var.symbol()].discard(stm.block)
-        self._def_qsym2blk[var.qualified_symbol()].discard(stm.block)
         self._def_stm2var[stm].discard(var)
-        self._def_blk2var[stm.block].discard(var)
+        if not self._has_block(self._def_sym2stm[var.symbol()], stm.block):
+            self._def_sym2blk[var.symbol()].discard(stm.block)
+        if not self._has_block(self._def_qsym2stm[var.qualified_symbol()], stm.block):
+            self._def_qsym2blk[var.qualified_symbol()].discard(stm.block)
+        # a var node can be shared by the statements (e.g. the psi made by PHIInlining)
+        if not self._has_block(self._def_var2stm[var], stm.block):
+            self._def_blk2var[stm.block].discard(var)
 
     def add_var_use(self, var, stm):
         assert var.is_a([TEMP, ATTR]) and stm.is_a(IRStm)
@@ -61,10 +65,13 @@ class UseDefTable(object):
         self._use_sym2stm[var.symbol()].discard(stm)
         self._use_qsym2stm[var.qualified_symbol()].discard(stm)
         self._use_var2stm[var].discard(stm)
-        self._use_sym2blk[var.symbol()].discard(stm.block)
-        self._use_qsym2blk[var.qualified_symbol()].discard(stm.block)
         self._use_stm2var[stm].discard(var)
-        self._use_blk2var[stm.block].discard(var)
+        if not self._has_block(self._use_sym2stm[var.symbol()], stm.block):
+            self._use_sym2blk[var.symbol()].discard(stm.block)
+        if not self._has_block(self._use_qsym2stm[var.qualified_symbol()], stm.block):
+            self._use_qsym2blk[var.qualified_symbol()].discard(stm.block)
+        if not self._has_block(self._use_var2stm[var], stm.block):
+            self._use_blk2var[stm.block].discard(var)
 
     def add_const_use(self, c, stm):
         assert c.is_a(CONST) and stm.is_a(IRStm)
@@ -94,11 +101,61 @@ class UseDefTable(object):
         for v in vs:
             self.remove_use(v, stm)
 
+    def _has_block(self, stms, blk):
+        for stm in stms:
+            if stm.block is blk:
+                return True
+        return False
+
+    def add_stm(self, stm):
+        detector = UseDefDetector()
+        detector.table = self
+        detector.visit(stm)
+
     def remove_stm(self, stm):
         self.remove_uses(list(self.get_vars_used_at(stm)), stm)
+        self.remove_uses(list(self.get_consts_used_at(stm)), stm)
         for v in list(self.get_vars_defined_at(stm)):
             self.remove_var_def(v, stm)
 
+    def update_stm(self, stm):
+        '''
+        Replaces the uses and defs of the statement with the current ones.
+        The table is not touched if the statement still has the same variables and constants.
+        '''
+        found = StmUseDefs()
+        detector = UseDefDetector()
+        detector.table = found
+        detector.visit(stm)
+        if (found.uses == self._use_stm2var.get(stm, found.empty) and
+                found.defs == self._def_stm2var.get(stm, found.empty) and
+                found.consts == self._use_stm2const.get(stm, found.empty)):
+            return
+        self.remove_stm(stm)
+        for v in found.defs:
+            self.add_var_def(v, stm)
+        for v in found.uses:
+            self.add_var_use(v, stm)
+        for c in found.consts:
+            self.add_const_use(c, stm)
+
+    def has_stm(self, stm):
+        return (stm in self._def_stm2var or
+                stm in self._use_stm2var or
+                stm in self._use_stm2const)
+
+    def _tables(self):
+        return {
+            name: {k: v for k, v in table.items() if v}
+            for name, table in self.__dict__.items() if isinstance(table, defaultdict)
+        }
+
+    def diff(self, other):
+        '''Returns the names of the tables that differ from the other'''
+        tables = self._tables()
+        other_tables = other._tables()
+        return [name for name in tables if tables[name] != other_tables[name]]
+
     def get_stms_defining(self, key):
         if isinstance(key, Symbol):
             return self._def_sym2stm[key]
@@ -191,6 +248,41 @@ class UseDefTable(object):
                 logger.debug('    ' + blk.name)
 
 
+class StmUseDefs(object):
+    '''Collects the uses and defs of a statement in place of UseDefTable'''
+    empty = frozenset()
+
+    def __init__(self):
+        self.defs = set()
+        self.uses = set()
+        self.consts = set()
+
+    def add_var_def(self, var, stm):
+        self.defs.add(var)
+
+    def add_var_use(self, var, stm):
+        self.uses.add(var)
+
+    def add_const_use(self, c, stm):
+        self.consts.add(c)
+
+
+class UseDefChecker(object):
+    '''Checks that the usedef table of the scope is the same as a rebuilt one'''
+    def process(self, scope):
+        if not scope.usedef:
+            return
+        table = scope.usedef
+        UseDefDetector().process(scope)
+        rebuilt = scope.usedef
+        scope.usedef = table
+        diffs = table.diff(rebuilt)
+        if diffs:
+            table.dump()
+            rebuilt.dump()
+            assert False, 'usedef of {} is out of date: {}'.format(scope.name, ', '.join(diffs))
+
+
 class UseDefDetector(IRVisitor):
     def __init__(self):
         super().__init__()
@@ -1,4 +1,7 @@
-﻿def is_a(inst, cls):
+﻿from collections import defaultdict, deque
+
+
+def is_a(inst, cls):
     if isinstance(cls, list) or isinstance(cls, tuple):
         for c in cls:
             if isinstance(inst, c):
@@ -44,7 +47,62 @@ def remove_except_one(lst, target):
 
 
 def unique(lst):
-    return sorted(list(set(lst)))
+    # the items that are equal in order keep the order of their first appearance
+    return sorted(dict.fromkeys(lst))
+
+
+class Worklist(object):
+    '''
+    A FIFO queue which holds an item at most once.
+    Appending an item that is already in the queue does nothing,
+    and a removed item is skipped lazily when it reaches the head of the queue.
+    '''
+    def __init__(self, items=None):
+        self._queue = deque()
+        self._items = set()
+        # the number of entries of each item in _queue (including removed ones)
+        self._entries = defaultdict(int)
+        if items:
+            self.extend(items)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __bool__(self):
+        return bool(self._items)
+
+    def __contains__(self, item):
+        return item in self._items
+
+    def append(self, item):
+        if item in self._items:
+            return False
+        self._items.add(item)
+        self._queue.append(item)
+        self._entries[item] += 1
+        return True
+
+    def extend(self, items):
+        for item in items:
+            self.append(item)
+
+    def remove(self, item):
+        self._items.remove(item)
+
+    def discard(self, item):
+        self._items.discard(item)
+
+    def popleft(self):
+        while True:
+            item = self._queue.popleft()
+            self._entries[item] -= 1
+            if self._entries[item]:
+                # an entry of the item that was removed and appended again
+                continue
+            del self._entries[item]
+            if item in self._items:
+                self._items.remove(item)
+                return item
 
 
 _36chars = [chr(ord('0') + i) for i in range(10)] + [chr(ord('a') + i) for i in range(26)]
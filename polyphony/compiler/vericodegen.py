@@ -271,7 +271,7 @@ class VerilogCodeGen(AHDLVisitor):
             ports.append('.clk(clk)')
             ports.append('.rst(rst)')
             conns = connections['']
-            for inf, acc in sorted(conns, key=lambda c: str(c)):
+            for inf, acc in sorted(conns, key=lambda c: (str(c[0]), str(c[1]))):
                 if acc.connected:
                     for p in inf.ports:
                         ports.append(self._to_sub_module_connect(name, inf, acc, p))
@@ -282,7 +282,7 @@ class VerilogCodeGen(AHDLVisitor):
                         else:
                             pass
             conns = connections['ret']
-            for inf, acc in sorted(conns, key=lambda c: str(c)):
+            for inf, acc in sorted(conns, key=lambda c: (str(c[0]), str(c[1]))):
                 if acc.connected:
                     for p in inf.ports:
                         ports.append(self._to_sub_module_connect(name, inf, acc, p))
@@ -319,9 +319,11 @@ class VerilogCodeGen(AHDLVisitor):
     def _generate_edge_detector(self):
         if not self.hdlmodule.edge_detectors:
             return
-        regs = set([sig for sig, _, _ in self.hdlmodule.edge_detectors])
+        edge_detectors = sorted(self.hdlmodule.edge_detectors,
+                                key=lambda e: (e[0].name, str(e[1]), str(e[2])))
+        regs = set([sig for sig, _, _ in edge_detectors])
         self.emit('//edge detectors')
-        for sig in regs:
+        for sig in sorted(regs):
             delayed_name = f'{sig.name}_d'
             self.emit(f'reg {delayed_name};')
             self.emit(f'always @(posedge clk) {delayed_name} <= {sig.name};')
@@ -332,7 +334,7 @@ class VerilogCodeGen(AHDLVisitor):
             #self.emit('')
 
         detect_var_names = set()
-        for sig, old, new in self.hdlmodule.edge_detectors:
+        for sig, old, new in edge_detectors:
             delayed_name = f'{sig.name}_d'
             detect_var_name = f'is_{sig.name}_change_{old}_to_{new}'
             if detect_var_name in detect_var_names:
@@ -834,10 +836,10 @@ class VerilogCodeGen(AHDLVisitor):
             self.visit(c)
 
     def visit(self, ahdl):
-        if ahdl.is_a(AHDL_STM):
+        visitor, is_stm = self.find_visitor(ahdl.__class__)
+        if is_stm:
             self.current_stm = ahdl
-        visitor = self.find_visitor(ahdl.__class__)
-        ret = visitor(ahdl)
+        ret = visitor(self, ahdl)
         if env.dev_debug_mode and ahdl in self.hdlmodule.ahdl2dfgnode:
             self._emit_source_text(ahdl)
         return ret
@@ -11,7 +11,8 @@ setuptools.setup(
     long_description=open('README.rst').read(),
     keywords="HLS High Level Synthesis FPGA HDL Verilog VHDL EDA",
     license='MIT',
-    entry_points={'console_scripts':['polyphony=polyphony.compiler.__main__:main'],},
+    entry_points={'console_scripts':['polyphony=polyphony.compiler.__main__:main',
+                                    'polyphony-batch=polyphony.compiler.batch:main'],},
     url='https://github.com/ktok07b6/polyphony',
 )
 # scripts=['bin/polyphony'],
\ No newline at end of file
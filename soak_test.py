@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+import argparse
+import gc
+import io
+import os
+import resource
+import sys
+import types
+from contextlib import redirect_stdout
+from polyphony.compiler.__main__ import compile_main
+from polyphony.compiler.scope import Scope
+from polyphony.compiler.symbol import Symbol
+
+
+ROOT_DIR = '.' + os.path.sep
+TEST_DIR = ROOT_DIR + 'tests'
+TMP_DIR  = ROOT_DIR + '.tmp'
+
+
+def parse_options():
+    if not os.path.exists(TMP_DIR):
+        os.mkdir(TMP_DIR)
+    parser = argparse.ArgumentParser(prog='soak_test')
+    parser.add_argument('-n', dest='count', type=int, default=200,
+                        help='number of the compilations')
+    parser.add_argument('-m', dest='max_growth', type=float, default=2.0,
+                        help='allowed growth of the maximum RSS in MB')
+    parser.add_argument('source', nargs='?', default=TEST_DIR + '/if/if01.py',
+                        help='Python source file')
+    return parser.parse_args()
+
+
+def make_compile_options(casename):
+    options = types.SimpleNamespace()
+    options.config = None
+    options.output_name = casename
+    options.output_dir = TMP_DIR
+    options.verbose_level = 0
+    options.quiet_level = 3
+    options.debug_mode = False
+    options.verilog_dump = False
+    options.verilog_monitor = False
+    return options
+
+
+def live_objects():
+    gc.collect()
+    scopes = symbols = 0
+    for obj in gc.get_objects():
+        if isinstance(obj, Scope):
+            scopes += 1
+        elif isinstance(obj, Symbol):
+            symbols += 1
+    return scopes, symbols
+
+
+def max_rss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def soak_test(casefile_path, count, max_growth):
+    '''
+    Compiles the same source count times in one process.
+    The scopes and symbols left after each compilation must not accumulate,
+    and the maximum RSS must stay within max_growth MB over the second half
+    of the compilations (the first half warms up the interpreter).
+    '''
+    casefile = os.path.basename(casefile_path)
+    casename, _ = os.path.splitext(casefile)
+    options = make_compile_options(casename)
+    warmup = max(1, count // 2)
+    for i in range(count):
+        with redirect_stdout(io.StringIO()):
+            compile_main(casefile_path, options)
+        if i + 1 == warmup:
+            base_objects = live_objects()
+            base_rss = max_rss_mb()
+    objects = live_objects()
+    rss = max_rss_mb()
+    print('{} compilations: scopes/symbols {} -> {}, max RSS {:.1f}MB -> {:.1f}MB'.format(
+        count, base_objects, objects, base_rss, rss))
+    if objects != base_objects:
+        print('[SOAK TEST] FAILED: scopes or symbols are leaked')
+        return False
+    if rss - base_rss > max_growth:
+        print('[SOAK TEST] FAILED: max RSS grew {:.1f}MB'.format(rss - base_rss))
+        return False
+    return True
+
+
+if __name__ == '__main__':
+    options = parse_options()
+    if not soak_test(options.source, options.count, options.max_growth):
+        sys.exit(1)
@@ -0,0 +1,31 @@
+from polyphony import testbench
+
+
+def seqparam01(xs):
+    s = 0
+    for i in range(len(xs)):
+        s += xs[i]
+    return s
+
+
+def twice(x):
+    return x * 2
+
+
+@testbench
+def test1():
+    data = [1, 2, 3, 4]
+    assert 10 == seqparam01(data)
+    data[0] = 11
+    assert 20 == seqparam01(data)
+
+
+@testbench
+def test2():
+    data = [5, 6, 7, 8]
+    assert 26 == seqparam01(data)
+    assert 52 == twice(26)
+
+
+test1()
+test2()
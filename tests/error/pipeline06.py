@@ -0,0 +1,19 @@
+#The loop-carried dependency of the pipeline cannot be satisfied with II=1
+from polyphony import testbench
+from polyphony import pipelined
+
+
+def pipeline06(xs):
+    idx = 0
+    for i in pipelined(range(8), ii=1):
+        idx = xs[idx]
+    return idx
+
+
+@testbench
+def test():
+    data = [1, 2, 3, 4, 5, 6, 7, 0]
+    assert 0 == pipeline06(data)
+
+
+test()
@@ -0,0 +1,16 @@
+#Invalid resources 'Mult:0', it must be like 'Mult:2,FloorDiv:1'
+from polyphony import testbench
+from polyphony import rule
+
+
+@rule(resources='Mult:0')
+def resources01(a, b):
+    return a * b
+
+
+@testbench
+def test():
+    assert 6 == resources01(2, 3)
+
+
+test()
@@ -0,0 +1,26 @@
+from polyphony import testbench
+from polyphony import rule
+
+
+def sq(x):
+    return x * x
+
+
+@rule(scheduling='balanced')
+def balanced01(a, b, c):
+    x = sq(a)
+    y = sq(x + 1)
+    z = sq(y + 1)
+    p = sq(b)
+    q = sq(c)
+    return z + p + q
+
+
+@testbench
+def test():
+    assert 38 == balanced01(1, 2, 3)
+    assert 6 == balanced01(0, 1, 1)
+    assert 701 == balanced01(2, 3, 4)
+
+
+test()
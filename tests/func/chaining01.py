@@ -0,0 +1,20 @@
+from polyphony import testbench
+from polyphony import rule
+
+
+@rule(cycle='any')
+def chaining01(a, b, c, d):
+    x = a + b
+    y = x & c
+    z = y | d
+    return z ^ a
+
+
+@testbench
+def test():
+    assert 2 == chaining01(1, 2, 3, 0)
+    assert 15 == chaining01(2, 3, 7, 8)
+    assert 4 == chaining01(10, 20, 12, 2)
+
+
+test()
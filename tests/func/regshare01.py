@@ -0,0 +1,36 @@
+from polyphony import testbench
+
+
+class Stack:
+    def __init__(self, size):
+        self.mem = [None] * size
+        self.idx = 0
+
+    def push(self, x):
+        self.mem[self.idx] = x
+        self.idx += 1
+
+    def pop(self):
+        self.idx -= 1
+        return self.mem[self.idx]
+
+
+def regshare01(a, b, c):
+    stack = Stack(8)
+    stack.push(a)
+    stack.push(b)
+    stack.push(c)
+    x = stack.pop() * 100
+    x += stack.pop() * 10
+    x += stack.pop()
+    return x
+
+
+@testbench
+def test():
+    assert 321 == regshare01(1, 2, 3)
+    assert 0 == regshare01(0, 0, 0)
+    assert 987 == regshare01(7, 8, 9)
+
+
+test()
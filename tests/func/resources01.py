@@ -0,0 +1,20 @@
+from polyphony import testbench
+from polyphony import rule
+
+
+@rule(resources='Mult:1')
+def resources01(a, b, c, d):
+    x = a * b
+    y = c * d
+    z = a * d
+    return x + y + z
+
+
+@testbench
+def test():
+    assert 3 == resources01(1, 1, 1, 1)
+    assert 36 == resources01(2, 3, 4, 5)
+    assert 6 == resources01(-1, 2, 3, 4)
+
+
+test()
@@ -0,0 +1,29 @@
+from polyphony import testbench
+
+
+def if31(xs, ys, zs):
+    for i in range(len(xs)):
+        x = xs[i]
+        if x & 1:
+            ys[i] = zs[x] + 1
+        else:
+            ys[i] = zs[i] * 2
+
+
+@testbench
+def test():
+    idata = [1, 2, 3, 4, 5, 6, 7, 0]
+    tdata = [10, 20, 30, 40, 50, 60, 70, 80]
+    odata = [0] * 8
+    if31(idata, odata, tdata)
+    assert 21 == odata[0]
+    assert 40 == odata[1]
+    assert 41 == odata[2]
+    assert 80 == odata[3]
+    assert 61 == odata[4]
+    assert 120 == odata[5]
+    assert 81 == odata[6]
+    assert 160 == odata[7]
+
+
+test()
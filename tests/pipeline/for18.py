@@ -0,0 +1,30 @@
+from polyphony import testbench
+from polyphony import pipelined
+
+
+def pipe18(xs, ys):
+    s = 0
+    for i in pipelined(range(len(xs))):
+        t = xs[i]
+        u = xs[7 - i]
+        s = xs[(s + 1) & 7]
+        ys[i] = t + u + s
+    return s
+
+
+@testbench
+def test():
+    data = [1, 2, 3, 4, 5, 6, 7, 0]
+    out_data = [0] * 8
+    assert 0 == pipe18(data, out_data)
+    assert 3 == out_data[0]
+    assert 13 == out_data[1]
+    assert 15 == out_data[2]
+    assert 9 == out_data[3]
+    assert 11 == out_data[4]
+    assert 13 == out_data[5]
+    assert 15 == out_data[6]
+    assert 1 == out_data[7]
+
+
+test()